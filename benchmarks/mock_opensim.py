@@ -0,0 +1,439 @@
+# Arquivo: mock_opensim.py
+#
+# :: Substituto mínimo da API do OpenSim usada por kinematic_class, para executar e
+# :: medir o caminho OpenCap em máquinas sem OpenSim instalado.
+# :: O "modelo" é um corpo planar simples: o centro de massa vertical depende de
+# :: pelvis_ty e dos ângulos de joelho; os demais graus de liberdade não têm massa.
+
+import numpy as np
+
+
+TRANSLATIONAL = 2
+ROTATIONAL = 1
+
+COORDINATES = [
+    ('pelvis_tilt', 'ground_pelvis', ROTATIONAL),
+    ('pelvis_tx', 'ground_pelvis', TRANSLATIONAL),
+    ('pelvis_ty', 'ground_pelvis', TRANSLATIONAL),
+    ('pelvis_tz', 'ground_pelvis', TRANSLATIONAL),
+    ('hip_flexion_r', 'hip_r', ROTATIONAL),
+    ('knee_angle_r', 'walker_knee_r', ROTATIONAL),
+    ('hip_flexion_l', 'hip_l', ROTATIONAL),
+    ('knee_angle_l', 'walker_knee_l', ROTATIONAL),
+    ('lumbar_extension', 'back', ROTATIONAL),
+]
+
+MUSCLES = ['glmax1_r', 'recfem_r', 'vasint_r', 'glmax1_l', 'recfem_l', 'vasint_l']
+
+# Distância do centro de massa da coxa/perna ao eixo do joelho (m)
+SEGMENT_OFFSET = 0.1
+
+
+######################### Estruturas auxiliares #########################
+
+class Logger:
+    @staticmethod
+    def setLevelString(level):
+        pass
+
+
+class _Array:
+    def __init__(self, values):
+        self._values = list(values)
+
+    def getSize(self):
+        return len(self._values)
+
+    def size(self):
+        return len(self._values)
+
+    def get(self, i):
+        return self._values[i]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __contains__(self, item):
+        return item in self._values
+
+    def __getitem__(self, i):
+        return self._values[i]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class StdVectorString(_Array):
+    pass
+
+
+class StdVectorDouble(_Array):
+    pass
+
+
+class Vector:
+    def __init__(self, values=None, fill=0.0):
+        if isinstance(values, int):
+            self._data = np.full(values, fill, dtype=float)
+        else:
+            self._data = np.array([] if values is None else values, dtype=float)
+
+    @staticmethod
+    def createFromMat(array):
+        return Vector(np.asarray(array, dtype=float).ravel())
+
+    def size(self):
+        return len(self._data)
+
+    def get(self, i):
+        return self._data[i]
+
+    def set(self, i, value):
+        self._data[i] = value
+
+    def to_numpy(self):
+        return self._data.copy()
+
+
+class Vec3(Vector):
+    pass
+
+
+class Matrix:
+    def __init__(self, nrows=0, ncols=0, fill=0.0):
+        self._data = np.full((nrows, ncols), fill, dtype=float)
+
+    @staticmethod
+    def createFromMat(array):
+        matrix = Matrix()
+        matrix._data = np.array(array, dtype=float, ndmin=2)
+        return matrix
+
+    def nrow(self):
+        return self._data.shape[0]
+
+    def ncol(self):
+        return self._data.shape[1]
+
+    def to_numpy(self):
+        return self._data.copy()
+
+
+######################### Tabelas #########################
+
+class TimeSeriesTable:
+    def __init__(self, source=None, matrix=None, labels=None):
+        self._meta = {}
+        if isinstance(source, str):
+            self._read_mot(source)
+        elif source is None:
+            self._time = np.zeros(0)
+            self._data = np.zeros((0, 0))
+            self._labels = []
+        else:
+            self._time = np.asarray(list(source), dtype=float)
+            self._data = matrix._data.copy()
+            self._labels = list(labels)
+
+    def _read_mot(self, path):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip() == 'endheader':
+                    break
+                if line.startswith('inDegrees'):
+                    self._meta['inDegrees'] = line.split('=')[1].strip()
+            labels = f.readline().split()
+            data = np.loadtxt(f, ndmin=2)
+        self._time = data[:, 0]
+        self._data = data[:, 1:]
+        self._labels = labels[1:]
+
+    def clone(self):
+        table = TimeSeriesTable()
+        table._time = self._time.copy()
+        table._data = self._data.copy()
+        table._labels = list(self._labels)
+        table._meta = dict(self._meta)
+        return table
+
+    def getColumnLabels(self):
+        return StdVectorString(self._labels)
+
+    def getIndependentColumn(self):
+        return StdVectorDouble(self._time)
+
+    def getMatrix(self):
+        return Matrix.createFromMat(self._data)
+
+    def getNumRows(self):
+        return self._data.shape[0]
+
+    def getNumColumns(self):
+        return self._data.shape[1]
+
+    def appendColumn(self, label, vector):
+        self._data = np.column_stack((self._data, vector._data))
+        self._labels.append(label)
+
+    def getNearestRowIndexForTime(self, t):
+        return int(np.argmin(np.abs(self._time - t)))
+
+    def trim(self, t0, t1):
+        keep = (self._time >= t0) & (self._time <= t1)
+        self._time = self._time[keep]
+        self._data = self._data[keep]
+
+    def addTableMetaDataString(self, key, value):
+        self._meta[key] = value
+
+    def hasTableMetaDataKey(self, key):
+        return key in self._meta
+
+    def getTableMetaDataAsString(self, key):
+        return self._meta[key]
+
+
+class TabOpUseAbsoluteStateNames:
+    pass
+
+
+class TabOpLowPassFilter:
+    def __init__(self, cutoff_frequency):
+        self.cutoff_frequency = cutoff_frequency
+
+
+class TableProcessor:
+    def __init__(self, table):
+        self._table = table
+        self._operators = []
+
+    def append(self, operator):
+        self._operators.append(operator)
+
+    def processAndConvertToRadians(self, model):
+        from scipy import signal
+
+        table = self._table.clone()
+        coordinates = dict((c.getName(), c) for c in model._coordinates)
+
+        if table._meta.get('inDegrees', 'yes') == 'yes':
+            for i, label in enumerate(table._labels):
+                if label in coordinates and coordinates[label].getMotionType() == ROTATIONAL:
+                    table._data[:, i] = np.deg2rad(table._data[:, i])
+        table._meta['inDegrees'] = 'no'
+
+        for operator in self._operators:
+            if isinstance(operator, TabOpLowPassFilter):
+                fs = 1 / np.mean(np.diff(table._time))
+                b, a = signal.butter(4, operator.cutoff_frequency / (fs / 2))
+                table._data = signal.filtfilt(b, a, table._data, axis=0, padtype='even')
+            if isinstance(operator, TabOpUseAbsoluteStateNames):
+                table._labels = [coordinates[label].getAbsolutePathString() + '/value'
+                                 if label in coordinates else label for label in table._labels]
+
+        return table
+
+
+######################### Modelo #########################
+
+class State:
+    def __init__(self, nq):
+        if isinstance(nq, State):
+            self.time = nq.time
+            self.q = nq.q.copy()
+            self.u = nq.u.copy()
+            return
+        self.time = 0.0
+        self.q = np.zeros(nq)
+        self.u = np.zeros(nq)
+
+    def getTime(self):
+        return self.time
+
+    def setTime(self, t):
+        self.time = t
+
+    def updTime(self):
+        return self.time
+
+
+class Coordinate:
+    def __init__(self, index, name, joint, motion_type):
+        self._index = index
+        self._name = name
+        self._joint = joint
+        self._motion_type = motion_type
+
+    def getName(self):
+        return self._name
+
+    def getMotionType(self):
+        return self._motion_type
+
+    def getAbsolutePathString(self):
+        return '/jointset/{joint}/{name}'.format(joint=self._joint, name=self._name)
+
+    def getValue(self, state):
+        return state.q[self._index]
+
+    def setValue(self, state, value, enforceConstraints=True):
+        state.q[self._index] = value
+
+    def getSpeedValue(self, state):
+        return state.u[self._index]
+
+    def setSpeedValue(self, state, value):
+        state.u[self._index] = value
+
+
+class _Set(_Array):
+    def get(self, key):
+        if isinstance(key, str):
+            for item in self._values:
+                if item.getName() == key:
+                    return item
+            raise KeyError(key)
+        return self._values[key]
+
+
+class Muscle:
+    def __init__(self, model, name):
+        self._model = model
+        self._name = name
+
+    def getName(self):
+        return self._name
+
+    def getConcreteClassName(self):
+        return 'DeGrooteFregly2016Muscle'
+
+    @staticmethod
+    def safeDownCast(obj):
+        return obj
+
+    def getLength(self, state):
+        side = self._model._coordinate_index['knee_angle' + self._name[-2:]]
+        return 0.3 + 0.02 * np.cos(state.q[side])
+
+    def computeMomentArm(self, state, coordinate):
+        return 0.04 * np.sin(state.q[coordinate._index] + len(self._name))
+
+
+class Model:
+    def __init__(self, path=None):
+        self._path = path
+        self._coordinates = [Coordinate(i, name, joint, motion)
+                             for i, (name, joint, motion) in enumerate(COORDINATES)]
+        self._coordinate_index = dict((name, i) for i, (name, _, _) in enumerate(COORDINATES))
+        self._muscles = [Muscle(self, name) for name in MUSCLES]
+
+    def initSystem(self):
+        self._working_state = State(len(self._coordinates))
+        return self._working_state
+
+    def getWorkingState(self):
+        return self._working_state
+
+    def getStateVariableNames(self):
+        names = []
+        for c in self._coordinates:
+            names.append(c.getAbsolutePathString() + '/value')
+            names.append(c.getAbsolutePathString() + '/speed')
+        for m in MUSCLES:
+            names.append('/forceset/{m}/activation'.format(m=m))
+            names.append('/forceset/{m}/normalized_tendon_force'.format(m=m))
+        return StdVectorString(names)
+
+    def getNumStateVariables(self):
+        return self.getStateVariableNames().getSize()
+
+    def setStateVariableValues(self, state, values):
+        values = values.to_numpy() if isinstance(values, Vector) else np.asarray(values)
+        n = len(self._coordinates)
+        state.q[:] = values[0:2 * n:2]
+        state.u[:] = values[1:2 * n:2]
+
+    def getStateVariableValues(self, state):
+        values = np.zeros(self.getNumStateVariables())
+        n = len(self._coordinates)
+        values[0:2 * n:2] = state.q
+        values[1:2 * n:2] = state.u
+        return Vector(values)
+
+    def getCoordinateSet(self):
+        return _Set(self._coordinates)
+
+    def getForceSet(self):
+        return _Set(self._muscles)
+
+    def getMuscles(self):
+        return _Set(self._muscles)
+
+    def getBodySet(self):
+        return _Set([])
+
+    def getSystem(self):
+        return self
+
+    def prescribe(self, state):
+        pass
+
+    def realizePosition(self, state):
+        pass
+
+    def realizeVelocity(self, state):
+        pass
+
+    def realizeAcceleration(self, state):
+        pass
+
+    def _com_y(self, q):
+        i = self._coordinate_index
+        return (q[i['pelvis_ty']] +
+                SEGMENT_OFFSET * (np.cos(q[i['knee_angle_r']]) + np.cos(q[i['knee_angle_l']])) / 2)
+
+    def calcMassCenterPosition(self, state):
+        i = self._coordinate_index
+        q = state.q
+        return Vec3([q[i['pelvis_tx']], self._com_y(q), q[i['pelvis_tz']]])
+
+    def calcMassCenterVelocity(self, state):
+        i = self._coordinate_index
+        q, u = state.q, state.u
+        vy = (u[i['pelvis_ty']] -
+              SEGMENT_OFFSET * (np.sin(q[i['knee_angle_r']]) * u[i['knee_angle_r']] +
+                                np.sin(q[i['knee_angle_l']]) * u[i['knee_angle_l']]) / 2)
+        return Vec3([u[i['pelvis_tx']], vy, u[i['pelvis_tz']]])
+
+
+class StatesTrajectory:
+    def __init__(self, states):
+        self._states = states
+
+    @staticmethod
+    def createFromStatesTable(model, table):
+        names = list(model.getStateVariableNames())
+        labels = table._labels
+        missing = [name for name in names if name not in labels]
+        if missing:
+            raise RuntimeError('Missing state variables: ' + ', '.join(missing[:3]))
+        columns = [labels.index(name) for name in names]
+        states = []
+        for row, t in enumerate(table._time):
+            state = model.initSystem()
+            state.setTime(t)
+            model.setStateVariableValues(state, table._data[row, columns])
+            states.append(state)
+        return StatesTrajectory(states)
+
+    def getSize(self):
+        return len(self._states)
+
+    def get(self, i):
+        return self._states[i]
+
+    def __getitem__(self, i):
+        return self._states[i]
+
+    def __len__(self):
+        return len(self._states)
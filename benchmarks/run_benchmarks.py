@@ -0,0 +1,350 @@
+# Arquivo: run_benchmarks.py
+#
+# :: Micro-benchmarks por etapa: leitura do ACP, filtragem, integração, reamostragem,
+# :: estimação de lag, MAE, gráficos e o caminho OpenCap (kinematics)
+# :: Os dados são sintéticos (synthetic_data.py) e, sem OpenSim instalado, o caminho
+# :: OpenCap usa o substituto mock_opensim.py. Os tempos são comparados com os
+# :: valores de referência em baselines.json. As referências dependem da máquina:
+# :: devem ser regravadas localmente (--update-baseline) antes de comparar
+# ::
+# :: Uso (a partir do diretório do projeto):
+# ::     python -m benchmarks.run_benchmarks [--duration 10] [--fs 1000] [--jumps 1]
+# ::     python -m benchmarks.run_benchmarks --update-baseline
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import numpy as np
+from os.path import dirname, abspath
+
+BENCHMARK_DIRECTORY = dirname(abspath(__file__))
+BASELINE_FILE       = os.path.join(BENCHMARK_DIRECTORY, "baselines.json")
+
+# Regressão: melhor tempo (mínimo das execuções, menos sensível à carga da máquina)
+# maior que a referência em mais de DEFAULT_THRESHOLD (fração) e em mais de
+# DEFAULT_MIN_DIFFERENCE (s), de modo que oscilações em funções muito rápidas não contem
+DEFAULT_THRESHOLD      = 0.5
+DEFAULT_MIN_DIFFERENCE = 1e-4
+DEFAULT_REPEAT         = 5
+# Duração mínima de cada execução: chamadas mais rápidas são repetidas em laço
+MIN_REPEAT_TIME        = 0.1
+
+SUITES = ["jumpy", "post_process", "render", "opencap"]
+
+
+# Usa o OpenSim instalado ou, na sua ausência (ou com force_mock), o substituto.
+# Deve ser chamada antes de importar os módulos de utils
+def install_opensim(force_mock=False):
+    if not force_mock:
+        try:
+            import opensim
+            return False
+        except ImportError:
+            pass
+    import benchmarks.mock_opensim as mock_opensim
+    sys.modules["opensim"] = mock_opensim
+    return True
+
+
+# Tempo de `number` chamadas seguidas. setup() prepara os argumentos de cada chamada
+# fora da medição. A saída de texto das funções é descartada
+def time_calls(function, setup, number):
+    calls = [setup() if setup is not None else () for i in range(number)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for args in calls:
+            function(*args)
+        return time.perf_counter() - start
+
+
+# Mediana e mínimo do tempo por chamada em `repeat` execuções. Como em timeit.autorange,
+# o número de chamadas por execução (1, 2, 5, 10, 20, ...) é o menor cuja duração
+# atinge MIN_REPEAT_TIME; a calibração também serve de aquecimento e não é contada
+def measure(function, setup=None, repeat=DEFAULT_REPEAT):
+    step, number = 0, 1
+    while time_calls(function, setup, number) < MIN_REPEAT_TIME:
+        step += 1
+        number = (1, 2, 5)[step % 3] * 10 ** (step // 3)
+
+    times = [time_calls(function, setup, number) / number for i in range(repeat)]
+    return {"median": float(np.median(times)), "min": float(np.min(times)), "number": number, "repeat": repeat}
+
+
+######################### Benchmarks #########################
+
+def jumpy_benchmarks(context):
+    import utils.jumpy_functions as jp_f
+    import utils.jump_metrics_functions as jm_f
+
+    acp = context["acp_file"]
+    fs = context["fs"]
+    fp_data, var_names, jump_type, mass, data_rate = jp_f.readForceFile(acp)
+    time_column, force = fp_data['Time (s)'], fp_data['Raw Fz (N)']
+    acel, vel, disp = jp_f.getAcelVelDisp(force, fs, mass)
+    output_directory = context["scratch_directory"]
+
+    return {
+        "jumpy.parseForceFile":      (lambda: jp_f.parseForceFile(acp), None),
+        "jumpy.readForceFile":       (lambda: jp_f.readForceFile(acp), None),
+        "jumpy.filterForceSignal":   (lambda: jp_f.filterForceSignal(time_column, force, fs, 'lowpass', jp_f.FILTER_TYPE,
+                                                                     jp_f.FILTER_CUTOFF_FREQUENCY, jp_f.FILTER_ORDER), None),
+        "jumpy.integrateSignal":     (lambda: jp_f.integrateSignal(acel, fs), None),
+        "jumpy.getAcelVelDisp":      (lambda: jp_f.getAcelVelDisp(force, fs, mass), None),
+        "jumpy.runAnalysisCMJSJ":    (lambda: jp_f.runAnalysisCMJSJ(acp), None),
+        "jumpy.save_jp_data_to_file": (lambda: jp_f.save_jp_data_to_file(time_column, [disp, vel, acel], output_directory,
+                                                                        "bench_jp", data_rate), None),
+        "jumpy.jump_metrics_files":  (lambda: jm_f.jump_metrics_files(context["acp_files"]), None),
+    }
+
+
+def post_process_benchmarks(context):
+    import utils.post_process_functions as pp_f
+    import utils.jumpy_functions as jp_f
+
+    fs, oc_fs = context["fs"], context["oc_fs"]
+    time_column, (disp, vel, acel), data_rate, jump_type = jp_f.runAnalysisCMJSJ(context["acp_file"])
+    jp_data = jp_f.jp_data_to_array(time_column, [disp, vel, acel])
+    downsampled = pp_f.downsample_multicolumn(jp_data, fs, oc_fs)
+
+    rng = np.random.default_rng(0)
+    signal1 = downsampled[:, 1]
+    signal2 = np.roll(signal1, 7) + rng.normal(0, 1e-3, len(signal1))
+    signals1 = np.tile(signal1, (context["trials"], 1))
+    signals2 = np.tile(signal2, (context["trials"], 1))
+    lag = pp_f.calculate_lag(signal1, signal2)
+    synced1, synced2 = pp_f.sync_signals(signal1, signal2, lag)
+    center = int(signal1.argmax())
+    window1, window2 = pp_f.crop_window(signal1, center), pp_f.crop_window(signal2, center)
+    synced_window1, synced_window2 = pp_f.sync_signals(window1, window2, lag)
+
+    benchmarks = {
+        "post_process.calculate_lag":          (lambda: pp_f.calculate_lag(signal1, signal2), None),
+        "post_process.calculate_lag_subsample": (lambda: pp_f.calculate_lag(signal1, signal2, subsample=True), None),
+        "post_process.calculate_lags":         (lambda: pp_f.calculate_lags(signals1, signals2), None),
+        "post_process.sync_signals":           (lambda: pp_f.sync_signals(signal1, signal2, lag), None),
+        "post_process.normalized_mae":         (lambda: pp_f.normalized_mae(synced1, synced2), None),
+        "post_process.crop_signal":            (lambda: pp_f.crop_signal(signal1, center), None),
+        "post_process.crop_window":            (lambda: pp_f.crop_window(signal1, center), None),
+        "post_process.sync_signals.window":    (lambda: pp_f.sync_signals(window1, window2, lag), None),
+        "post_process.normalized_mae.window":  (lambda: pp_f.normalized_mae(synced_window1, synced_window2), None),
+    }
+    for engine in pp_f.RESAMPLE_ENGINES:
+        benchmarks["post_process.downsample_multicolumn." + engine] = (
+            lambda engine=engine: pp_f.downsample_multicolumn(jp_data, fs, oc_fs, engine=engine), None)
+
+    return benchmarks
+
+
+def render_benchmarks(context):
+    import utils.render_functions as render_f
+
+    rng = np.random.default_rng(0)
+    x = np.arange(context["oc_samples"]) / context["oc_fs"]
+    series_list = [render_f.series(x, rng.normal(size=len(x)).cumsum(), label="a", color='red'),
+                   render_f.series(x, rng.normal(size=len(x)).cumsum(), label="b", color='green')]
+    path = os.path.join(context["scratch_directory"], "bench_plot.png")
+
+    def line_plot(mode):
+        render_f.configure(mode=mode, background=False)
+        try:
+            render_f.line_plot(path, series_list, "Benchmark", "Tempo (s)", "Amplitude",
+                               figsize=(10, 6), dpi=render_f.FULL_DPI, format='png')
+        finally:
+            render_f.configure(mode=render_f.RENDER_FULL, background=True)
+
+    return {
+        "render.line_plot.full":    (lambda: line_plot(render_f.RENDER_FULL), None),
+        "render.line_plot.preview": (lambda: line_plot(render_f.RENDER_PREVIEW), None),
+    }
+
+
+def opencap_benchmarks(context):
+    import utils.osim_functions as osim_f
+    from utils.kinematic_class import kinematics
+
+    oc_directory, trial = context["oc_directory"], context["mot_trial"]
+
+    def new_kinematics():
+        return (kinematics(oc_directory, trial, osim_f.MODEL,
+                           lowpass_cutoff_frequency_for_coordinate_values=10),)
+
+    return {
+        "opencap.kinematics":            (lambda: new_kinematics(), None),
+        "opencap.center_of_mass":        (lambda k: k.get_center_of_mass_kinematics(10), new_kinematics),
+        "opencap.moment_arms":           (lambda k: k.get_moment_arms(), new_kinematics),
+        "opencap.muscle_tendon_lengths": (lambda k: k.get_muscle_tendon_lengths(), new_kinematics),
+        "opencap.com_analisys":          (lambda: osim_f.com_analisys(oc_directory, trial), None),
+    }
+
+
+BENCHMARK_SUITES = {
+    "jumpy":        jumpy_benchmarks,
+    "post_process": post_process_benchmarks,
+    "render":       render_benchmarks,
+    "opencap":      opencap_benchmarks,
+}
+
+
+######################### Dados sintéticos #########################
+
+def create_context(directory, params):
+    import benchmarks.synthetic_data as sd
+
+    subject_directory = os.path.join(directory, "subject")
+    sd.make_subject(subject_directory, n_trials=params["trials"], fs=params["fs"], oc_fs=params["oc_fs"],
+                    n_jumps=params["jumps"], duration=params["duration"])
+
+    jumpy_directory = os.path.join(subject_directory, "jumpy")
+    acp_files = sorted(os.path.join(jumpy_directory, f) for f in os.listdir(jumpy_directory) if f.endswith(".acp"))
+    scratch_directory = os.path.join(directory, "scratch")
+    os.makedirs(scratch_directory, exist_ok=True)
+
+    context = dict(params)
+    context.update({
+        "acp_file":          acp_files[0],
+        "acp_files":         acp_files,
+        "oc_directory":      os.path.join(subject_directory, "opencap"),
+        "mot_trial":         "opencap_salto_1",
+        "oc_samples":        int(params["duration"] * params["oc_fs"]),
+        "scratch_directory": scratch_directory,
+    })
+    return context
+
+
+######################### Referências #########################
+
+def load_baselines(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baselines(path, params, results):
+    baselines = {
+        "params":   params,
+        "platform": {"python": platform.python_version(), "machine": platform.machine(),
+                     "system": platform.system(), "numpy": np.__version__},
+        "results":  {name: {"min": stats["min"], "median": stats["median"]} for name, stats in results.items()},
+    }
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+
+
+# Compara os melhores tempos com as referências. Retorna as linhas do relatório e os
+# nomes dos benchmarks com regressão
+def compare_baselines(results, baselines, params, threshold, min_difference=DEFAULT_MIN_DIFFERENCE):
+    reference = {}
+    if baselines is not None:
+        if baselines.get("params") != params:
+            print("Aviso: parâmetros diferentes dos usados nas referências; comparação ignorada")
+        else:
+            reference = baselines.get("results", {})
+
+    rows, regressions = [], []
+    for name, stats in results.items():
+        base = reference.get(name, {}).get("min")
+        if base is None:
+            rows.append((name, stats["min"], None, None, "novo"))
+            continue
+        ratio = stats["min"] / base
+        status = "OK"
+        if ratio > 1 + threshold and stats["min"] - base > min_difference:
+            status = "REGRESSÃO"
+            regressions.append(name)
+        rows.append((name, stats["min"], base, ratio, status))
+
+    return rows, regressions
+
+
+def print_report(rows):
+    print("{:<45} {:>12} {:>12} {:>8}  {}".format("Benchmark", "Mínimo (ms)", "Ref. (ms)", "Razão", "Status"))
+    for name, best, base, ratio, status in rows:
+        print("{:<45} {:>12.3f} {:>12} {:>8}  {}".format(
+            name, best * 1e3,
+            "-" if base is None else "{:.3f}".format(base * 1e3),
+            "-" if ratio is None else "{:.2f}".format(ratio),
+            status))
+
+
+######################### Execução #########################
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks das etapas de análise")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração dos registros sintéticos (s)")
+    parser.add_argument("--fs", type=int, default=1000, help="Taxa de amostragem da plataforma de força (Hz)")
+    parser.add_argument("--oc-fs", type=int, default=60, help="Taxa de amostragem do OpenCap (Hz)")
+    parser.add_argument("--jumps", type=int, default=1, help="Número de saltos por registro")
+    parser.add_argument("--trials", type=int, default=8, help="Número de ensaios (benchmarks em lote)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Execuções por benchmark (cada uma com o número de chamadas calibrado)")
+    parser.add_argument("--only", default=",".join(SUITES),
+                        help="Conjuntos executados, separados por vírgula ({suites})".format(suites=",".join(SUITES)))
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Aumento relativo do melhor tempo considerado regressão")
+    parser.add_argument("--min-difference", type=float, default=DEFAULT_MIN_DIFFERENCE * 1e3,
+                        help="Aumento absoluto mínimo do melhor tempo considerado regressão (ms)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Arquivo de referências")
+    parser.add_argument("--update-baseline", action="store_true", help="Grava os tempos medidos como referência")
+    parser.add_argument("--mock-opensim", action="store_true", help="Usa o substituto do OpenSim mesmo se instalado")
+    parser.add_argument("--output", help="Grava os resultados (JSON)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    mocked = install_opensim(args.mock_opensim)
+    if mocked:
+        print("OpenSim substituído por benchmarks/mock_opensim.py")
+
+    params = {"duration": args.duration, "fs": args.fs, "oc_fs": args.oc_fs,
+              "jumps": args.jumps, "trials": args.trials, "mock_opensim": mocked}
+
+    suites = [suite.strip() for suite in args.only.split(",") if suite.strip()]
+    for suite in suites:
+        if suite not in BENCHMARK_SUITES:
+            raise ValueError("Conjunto de benchmarks inválido: {suite}".format(suite=suite))
+
+    directory = tempfile.mkdtemp(prefix="kmt_bench_")
+    try:
+        context = create_context(directory, params)
+
+        results = {}
+        for suite in suites:
+            with contextlib.redirect_stdout(io.StringIO()):
+                benchmarks = BENCHMARK_SUITES[suite](context)
+            for name, (function, setup) in benchmarks.items():
+                results[name] = measure(function, setup, repeat=args.repeat)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    rows, regressions = compare_baselines(results, load_baselines(args.baseline), params, args.threshold,
+                                          args.min_difference * 1e-3)
+    print_report(rows)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"params": params, "results": results}, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        save_baselines(args.baseline, params, results)
+        print("Referências gravadas em {path}".format(path=args.baseline))
+    elif regressions:
+        print("{n} benchmark(s) com regressão acima de {t:.0%} e {d:.3f} ms".format(
+            n=len(regressions), t=args.threshold, d=args.min_difference))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
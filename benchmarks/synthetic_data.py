@@ -0,0 +1,140 @@
+# Arquivo: synthetic_data.py
+#
+# :: Gerador de dados sintéticos para benchmarks: arquivos ACP (plataforma de força),
+# :: trajetórias de centro de massa e arquivos .mot com a mesma estrutura dos
+# :: diretórios esperados por main.py
+
+import os
+import numpy as np
+
+
+g = 9.7838
+
+QUIET_TIME = 1.5   # Tempo parado no início do registro (s)
+
+
+# Perfil de aceleração vertical de um salto com contramovimento
+# Retorna aceleração e o tempo total do salto
+def cmj_acceleration(fs, takeoff_velocity=2.4, countermovement_time=0.6, propulsion_time=0.3,
+                     landing_time=0.25, recovery_time=1.0, depth_amplitude=6.0):
+
+    flight_time = 2 * takeoff_velocity / g
+
+    def phase(duration):
+        n = max(int(round(duration * fs)), 1)
+        return np.arange(n) / fs, n
+
+    tau, _ = phase(countermovement_time)
+    countermovement = -depth_amplitude * np.sin(2 * np.pi * tau / countermovement_time)
+
+    tau, _ = phase(propulsion_time)
+    propulsion = (np.pi * takeoff_velocity / (2 * propulsion_time)) * np.sin(np.pi * tau / propulsion_time)
+
+    _, n_flight = phase(flight_time)
+    flight = np.full(n_flight, -g)
+
+    tau, _ = phase(landing_time)
+    landing = (np.pi * takeoff_velocity / (2 * landing_time)) * np.sin(np.pi * tau / landing_time)
+
+    _, n_recovery = phase(recovery_time)
+    recovery = np.zeros(n_recovery)
+
+    return np.concatenate((countermovement, propulsion, flight, landing, recovery))
+
+
+# Aceleração vertical de um registro: período parado seguido de n_jumps saltos,
+# completado (ou cortado) para `duration` segundos, quando informado
+def synthetic_acceleration(fs, n_jumps=1, duration=None, **jump_kwargs):
+    acceleration = [np.zeros(int(QUIET_TIME * fs))]
+    for i in range(n_jumps):
+        acceleration.append(cmj_acceleration(fs, **jump_kwargs))
+    acceleration = np.concatenate(acceleration)
+
+    if duration is not None:
+        n = int(duration * fs)
+        if n > len(acceleration):
+            acceleration = np.concatenate((acceleration, np.zeros(n - len(acceleration))))
+        acceleration = acceleration[:n]
+
+    return acceleration
+
+
+# Sinal de força vertical (N) com n_jumps saltos e ruído gaussiano
+def synthetic_force(fs=1000, mass=75.0, n_jumps=1, noise=2.0, seed=0, duration=None, **jump_kwargs):
+    rng = np.random.default_rng(seed)
+
+    acceleration = synthetic_acceleration(fs, n_jumps, duration, **jump_kwargs)
+
+    force = mass * (g + acceleration) + rng.normal(0, noise, len(acceleration))
+    force[force < 0] = 0
+    return force
+
+
+# Trajetória vertical do centro de massa a partir da aceleração (integração simples)
+def com_trajectory(acceleration, fs, height=1.0):
+    velocity = np.cumsum(acceleration) / fs
+    position = height + np.cumsum(velocity) / fs
+    return position, velocity
+
+
+def write_acp(file_path, force, fs, mass=75.0, jump_type="Countermovement Jump", header_mass=True,
+              header_rate=True):
+    time = np.arange(len(force)) / fs
+    with open(file_path, 'w') as f:
+        f.write("{jump_type}\n".format(jump_type=jump_type))
+        if header_mass:
+            f.write("{mass:.2f}\t(body weight)\n".format(mass=mass))
+        if header_rate:
+            f.write("{n} @ {fs} (number of samples, data rate)\n".format(n=len(force), fs=int(fs)))
+        f.write("Time (s)\tRaw Fz (N)\tFiltered Fz (N)\n")
+        np.savetxt(f, np.column_stack((time, force, force)), delimiter='\t', fmt='%.6f')
+
+
+# Arquivo .mot com coordenadas do modelo substituto (mock_opensim), gerado a partir
+# da trajetória vertical do centro de massa
+def write_mot(file_path, com_y, fs=60, segment_offset=0.1):
+    time = np.arange(len(com_y)) / fs
+    depth = np.clip(com_y.max() - com_y, 0, None)
+    knee = np.clip(90 * depth / max(depth.max(), 1e-6), 0, 90)
+    pelvis_ty = com_y - segment_offset * np.cos(np.deg2rad(knee))
+
+    columns = {
+        'pelvis_tilt': 5 * np.sin(2 * np.pi * time / len(time)),
+        'pelvis_tx': np.zeros(len(time)),
+        'pelvis_ty': pelvis_ty,
+        'pelvis_tz': np.zeros(len(time)),
+        'hip_flexion_r': knee / 2,
+        'knee_angle_r': knee,
+        'hip_flexion_l': knee / 2,
+        'knee_angle_l': knee,
+        'lumbar_extension': np.zeros(len(time)),
+    }
+
+    with open(file_path, 'w') as f:
+        f.write("Coordinates\nversion=1\nnRows={n}\nnColumns={c}\ninDegrees=yes\nendheader\n".format(
+            n=len(time), c=len(columns) + 1))
+        f.write("\t".join(['time'] + list(columns)) + "\n")
+        np.savetxt(f, np.column_stack([time] + list(columns.values())), delimiter='\t', fmt='%.8f')
+
+
+# Cria um diretório de voluntário completo (opencap/ e jumpy/) com n_trials ensaios
+def make_subject(directory, n_trials=3, fs=1000, oc_fs=60, mass=75.0, n_jumps=1, model_name="LaiUhlrich2022_scaled",
+                 seed=0, duration=None):
+    model_directory = os.path.join(directory, "opencap", "OpenSimData", "Model")
+    kinematics_directory = os.path.join(directory, "opencap", "OpenSimData", "Kinematics")
+    jumpy_directory = os.path.join(directory, "jumpy")
+    for d in [model_directory, kinematics_directory, jumpy_directory]:
+        os.makedirs(d, exist_ok=True)
+
+    with open(os.path.join(model_directory, model_name + ".osim"), 'w') as f:
+        f.write("<OpenSimDocument Version=\"40000\"><Model name=\"{m}\"/></OpenSimDocument>\n".format(m=model_name))
+
+    for trial in range(1, n_trials + 1):
+        takeoff_velocity = 2.2 + 0.1 * trial
+        force = synthetic_force(fs, mass, n_jumps=n_jumps, seed=seed + trial, duration=duration,
+                                takeoff_velocity=takeoff_velocity)
+        write_acp(os.path.join(jumpy_directory, "jumpy_salto_{t}.acp".format(t=trial)), force, fs, mass)
+
+        acceleration = synthetic_acceleration(oc_fs, n_jumps, duration, takeoff_velocity=takeoff_velocity)
+        com_y, _ = com_trajectory(acceleration, oc_fs)
+        write_mot(os.path.join(kinematics_directory, "opencap_salto_{t}.mot".format(t=trial)), com_y, oc_fs)
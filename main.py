@@ -11,11 +11,22 @@ import json
 import time
 from pathlib import Path
 import re
+import argparse
+import pandas as pd
+from concurrent.futures import Executor, ProcessPoolExecutor, Future
 
 # Function files
 import utils.osim_functions as osim_f
 import utils.post_process_functions as pp_f
 import utils.jumpy_functions as jp_f
+import utils.render_functions as render_f
+import utils.cache_functions as cache_f
+import utils.jump_metrics_functions as jm_f
+import utils.cohort_functions as co_f
+import utils.dtw_functions as dtw_f
+import utils.trace_functions as trace_f
+import utils.metadata_functions as meta_f
+import utils.results_functions as res_f
 
 
 # Lista apenas os arquivos com a extensão especificada
@@ -63,84 +74,98 @@ def setup(setup_file):
     return setup_dic
 
 
-# Realiza o pareamento de arquivos com mesmo número no final para comparação
-# (Ex: salto_plataforma_1.txt e salto_opencap_1.txt)
-def file_pairing(dir_a, dir_b):
-    def get_files_with_numeric_suffix(directory):
-        files = {}
-        for file in os.listdir(directory):
-            if file.endswith('.txt'):
-                match = re.search(r'(\d+)\.txt$', file)  # Captura o número antes de .txt
-                if match:
-                    files[match.group(1)] = file
-        return files
-    
+# Parâmetros de análise (também registrados no cache de resultados)
+OC_CUTOFF_FREQUENCY = 10
+OC_SAMPLE_RATE      = 60
 
 
+# Arquivos de figura gerados para um arquivo de dados, se a renderização estiver ativa
+def figure_files(output_directory,labels,file_name):
+    if not render_f.rendering_enabled():
+        return []
+    return [os.path.join(output_directory,"fig_"+label+"_"+file_name+".png") for label in labels]
 
+
+# Número do ensaio: sufixo numérico do nome do arquivo de origem (ex: salto_3.acp -> "3")
+def trial_number(file_path):
+    match = re.search(r'(\d+)$', Path(file_path).stem)
+    return match.group(1) if match else None
+
+
+# Dados de um ensaio entregues diretamente à etapa de comparação
+def trial_data(file_path,name,data,sample_rate=None,jump_type=None):
+    return {"trial": trial_number(file_path), "file": file_path, "name": name, "data": data, "sample_rate": sample_rate,
+            "jump_type": jump_type}
+
+
+# Análise de centro de massa de um único arquivo .mot
+# Retorna os arquivos gerados (o primeiro é o arquivo de dados, se gravado),
+# o resultado da análise e os dados do ensaio para a comparação
+def mot_trial_com_analysis(mot_file_path,oc_directory,com_output_directory,export_csv=False,save_intermediates=True):
+    mot_file_name = Path(mot_file_path).stem
     
-    files_a = get_files_with_numeric_suffix(dir_a)
-    files_b = get_files_with_numeric_suffix(dir_b)
-    
-    if len(files_a) != len(files_b):
-        print("Inconsistência no número de arquivos para comparação:")
-        print("Arquivos em",dir_a,": ",len(files_a))
-        print("Arquivos em",dir_b,": ",len(files_b))
-        return None
+    com_data = osim_f.com_analisys(oc_directory,mot_file_name,cutoff_frequency = OC_CUTOFF_FREQUENCY)
     
-    matched_files = [( os.path.join(dir_a,files_a[num]) , os.path.join(dir_b,files_b[num]) ) for num in files_a if num in files_b]
+    file_name = "oc_com_"+mot_file_name+".txt"
     
-    return matched_files
+    com_labels = ["Posição","Velocidade","Aceleração"]
+    com_units =  ["m","m/s","m/s^2"]
 
+    for i in range(3):
+        var,label,unit = com_data[i],com_labels[i],com_units[i]
+        osim_f.save_oc_figure(var,label,unit,file_name,com_output_directory)
 
-def mot_file_com_analysis(mot_file_list,oc_directory,com_output_directory):
-    
-    for mot_file_path in mot_file_list:
-        mot_file_name = Path(mot_file_path).stem
-        
-        com_data = osim_f.com_analisys(oc_directory,mot_file_name,cutoff_frequency = 10)
-        
-        file_name = "oc_com_"+mot_file_name+".txt"
-        
-        com_labels = ["Posição","Velocidade","Aceleração"]
-        com_units =  ["m","m/s","m/s^2"]
 
-        for i in range(3):
-            var,label,unit = com_data[i],com_labels[i],com_units[i]
-            osim_f.save_oc_figure(var,label,unit,file_name,com_output_directory)
+    saved_files = []
+    if save_intermediates:
+        saved_files = osim_f.save_com_data_to_file(com_data,com_output_directory,file_name,export_csv=export_csv)
 
+    outputs = saved_files + figure_files(com_output_directory,com_labels,file_name)
+    return outputs, None, trial_data(mot_file_path,file_name,osim_f.com_data_to_array(com_data))
 
-        osim_f.save_com_data_to_file(com_data,com_output_directory,file_name)
 
-        
+# Análise de um único arquivo .acp
+# Retorna os arquivos gerados (o primeiro é o arquivo de dados, se gravado), a taxa de
+# amostragem e o tipo de salto do arquivo (registrados no manifesto) e os dados do
+# ensaio para a comparação
+def jumpy_trial_analysis(acp_file_path,jp_output_directory,export_csv=False,save_intermediates=True):
+    acp_file_name = Path(acp_file_path).stem
+    
+    
+    time, fp_data, data_rate, jump_type = jp_f.runAnalysisCMJSJ(acp_file_path)
+    
+    file_name = "jumpy_cmj_"+acp_file_name+".txt"
 
-def jumpy_file_analisys(acp_file_list,jp_output_directory):
-    for acp_file_path in acp_file_list:
-        acp_file_name = Path(acp_file_path).stem
-        
-        
-        time, fp_data, data_rate = jp_f.runAnalysisCMJSJ(acp_file_path)
-        
-        file_name = "jumpy_cmj_"+acp_file_name+".txt"
+    
+    fp_labels = ["Deslocamento","Velocidade","Acelereação"]
+    fp_units =  ["m","m/s","m/s^2"]
 
-        
-        fp_labels = ["Deslocamento","Velocidade","Acelereação"]
-        fp_units =  ["m","m/s","m/s^2"]
+    for i in range(3):
+        var,label,unit = fp_data[i],fp_labels[i], fp_units[i]
+        jp_f.save_jp_figure(time,var,label,unit,file_name,jp_output_directory)
 
-        for i in range(3):
-            var,label,unit = fp_data[i],fp_labels[i], fp_units[i]
-            jp_f.save_jp_figure(time,var,label,unit,file_name,jp_output_directory)
+    saved_files = []
+    if save_intermediates:
+        saved_files = jp_f.save_jp_data_to_file(time,fp_data,jp_output_directory,file_name,data_rate=data_rate,export_csv=export_csv)
 
-        jp_f.save_jp_data_to_file(time,fp_data,jp_output_directory,file_name)
+    outputs = saved_files + figure_files(jp_output_directory,fp_labels,file_name)
+    result = {"sample_rate": data_rate, "jump_type": jump_type}
+    return outputs, result, trial_data(acp_file_path,file_name,jp_f.jp_data_to_array(time,fp_data),**result)
 
-    return data_rate
 
-def plot_signals(oc_data,jp_data,cp_directory,file_name,fp_sample_rate):
+# Retorna os arquivos gerados pela comparação e o MAE normalizado de cada canal.
+# O arquivo de texto mae_*.txt é gravado apenas com export_mae
+def plot_signals(oc_data,jp_data,cp_directory,file_name,fp_sample_rate,resample_engine=pp_f.RESAMPLE_SINC,
+                 export_mae=False):
     
 
-    oc_sample_rate = 60 
+    oc_sample_rate = OC_SAMPLE_RATE 
 
-    jp_data_downsampled = pp_f.downsample_multicolumn(jp_data,fp_sample_rate,oc_sample_rate)
+    # No método "interp" os dados da plataforma são interpolados nos instantes dos quadros do OpenCap
+    target_time = oc_data[:,0] if resample_engine == pp_f.RESAMPLE_INTERP else None
+    with trace_f.span("compare.resample", "compare", engine=resample_engine):
+        jp_data_downsampled = pp_f.downsample_multicolumn(jp_data,fp_sample_rate,oc_sample_rate,
+                                                          engine=resample_engine,target_time=target_time)
 
     time = 0
     pos  = 1
@@ -149,42 +174,341 @@ def plot_signals(oc_data,jp_data,cp_directory,file_name,fp_sample_rate):
     
     com_height = pp_f.exract_com_height_oc(oc_data[:,pos])
 
-    # Corta utilizando o ponto de maior altura como ponto médio
+    # Corta utilizando o ponto de maior altura como ponto médio. Os recortes são janelas
+    # (AlignedSignal) sobre as colunas dos dados, sem cópia
     oc_max_height_index = oc_data[:,pos].argmax()
     fp_max_height_index = jp_data_downsampled[:,pos].argmax()
 
-    time_column       = pp_f.crop_signal(oc_data[:,time] , oc_max_height_index)
-    oc_com_pos_column = pp_f.crop_signal(oc_data[:,pos]  , oc_max_height_index)
-    oc_com_vel_column = pp_f.crop_signal(oc_data[:,vel]  , oc_max_height_index)
-    oc_com_acc_column = pp_f.crop_signal(oc_data[:,acc]  , oc_max_height_index)
-    
-    fp_com_disp_column = pp_f.crop_signal(jp_data_downsampled[:,pos] ,fp_max_height_index)
-    fp_com_vel_column  = pp_f.crop_signal(jp_data_downsampled[:,vel] ,fp_max_height_index)
-    fp_com_acc_column  = pp_f.crop_signal(jp_data_downsampled[:,acc] ,fp_max_height_index)
+    time_column       = pp_f.crop_window(oc_data[:,time] , oc_max_height_index)
+    oc_com_pos_column = pp_f.crop_window(oc_data[:,pos]  , oc_max_height_index)
+    oc_com_vel_column = pp_f.crop_window(oc_data[:,vel]  , oc_max_height_index)
+    oc_com_acc_column = pp_f.crop_window(oc_data[:,acc]  , oc_max_height_index)
     
-    fp_com_pos_column = fp_com_disp_column + com_height
+    fp_com_pos_column = pp_f.crop_window(jp_data_downsampled[:,pos] + com_height ,fp_max_height_index)
+    fp_com_vel_column = pp_f.crop_window(jp_data_downsampled[:,vel] ,fp_max_height_index)
+    fp_com_acc_column = pp_f.crop_window(jp_data_downsampled[:,acc] ,fp_max_height_index)
 
     # Realiza o ajuste fino baseado no lag da correlação
-    lag = pp_f.calculate_lag(oc_com_pos_column,fp_com_pos_column)
+    with trace_f.span("compare.lag", "compare"):
+        lag = pp_f.calculate_lag(oc_com_pos_column.values,fp_com_pos_column.values)
 
-    oc_com_pos_column, fp_com_pos_column = pp_f.sync_signals(oc_com_pos_column, fp_com_pos_column ,lag)
-    oc_com_vel_column, fp_com_vel_column = pp_f.sync_signals(oc_com_vel_column, fp_com_vel_column ,lag)
-    oc_com_acc_column, fp_com_acc_column = pp_f.sync_signals(oc_com_acc_column, fp_com_acc_column ,lag)
-    print(oc_com_pos_column)
-    print(fp_com_pos_column)
+        oc_com_pos_column, fp_com_pos_column = pp_f.sync_signals(oc_com_pos_column, fp_com_pos_column ,lag)
+        oc_com_vel_column, fp_com_vel_column = pp_f.sync_signals(oc_com_vel_column, fp_com_vel_column ,lag)
+        oc_com_acc_column, fp_com_acc_column = pp_f.sync_signals(oc_com_acc_column, fp_com_acc_column ,lag)
     
-    pos_mae = pp_f.compare_signals(fp_com_pos_column,  oc_com_pos_column,time_column,"Posição"   ,cp_directory, file_name)
-    vel_mae = pp_f.compare_signals(fp_com_vel_column,  oc_com_vel_column,time_column,"Velocidade",cp_directory, file_name)
-    acc_mae = pp_f.compare_signals(fp_com_acc_column,  oc_com_acc_column,time_column,"Aceleração",cp_directory, file_name)
+    cp_titles = ["Posição","Velocidade","Aceleração"]
+
+    with trace_f.span("compare.mae", "compare"):
+        pos_mae = pp_f.compare_signals(fp_com_pos_column,  oc_com_pos_column,time_column,cp_titles[0],cp_directory, file_name)
+        vel_mae = pp_f.compare_signals(fp_com_vel_column,  oc_com_vel_column,time_column,cp_titles[1],cp_directory, file_name)
+        acc_mae = pp_f.compare_signals(fp_com_acc_column,  oc_com_acc_column,time_column,cp_titles[2],cp_directory, file_name)
+
+    outputs = []
+    if export_mae:
+        last_name = Path(file_name).stem
+        pp_f.save_mae_to_file(last_name,cp_directory,pos_mae,vel_mae,acc_mae)
+        outputs.append(os.path.join(cp_directory,"mae_"+last_name+".txt"))
+
+    if render_f.rendering_enabled():
+        outputs += [os.path.join(cp_directory,title+"_"+file_name) for title in cp_titles]
+    return outputs, {"pos": float(pos_mae), "vel": float(vel_mae), "acc": float(acc_mae)}
+
+
+
+def compare_file_name(oc_file,jp_file):
+    return Path(oc_file).stem + "_" + Path(jp_file).stem + ".jpg"
+
+
+# Comparação de um par de ensaios já em memória (OpenCap, jumpy).
+# O MAE de cada canal é o resultado registrado no manifesto do cache
+def compare_trial(oc_data,jp_data,cp_output_directory,file_name,jp_sample_rate,resample_engine=pp_f.RESAMPLE_SINC,
+                  export_mae=False):
+
+    outputs, maes = plot_signals(oc_data,jp_data,cp_output_directory,file_name,jp_sample_rate,resample_engine,
+                                 export_mae)
+    return outputs, maes, None
+
+
+# Pareia os ensaios pelo número no final do nome do arquivo de origem.
+# Ensaios que falharam em uma das fontes são excluídos das duas
+def trial_pairing(oc_trials, jp_trials, failed=()):
+
+    oc_trials = {num: trial for num, trial in oc_trials.items() if num not in failed}
+    jp_trials = {num: trial for num, trial in jp_trials.items() if num not in failed}
+
+    if len(oc_trials) != len(jp_trials):
+        print("Inconsistência no número de ensaios para comparação:")
+        print("Ensaios OpenCap: ",len(oc_trials))
+        print("Ensaios jumpy: ",len(jp_trials))
+        return None
+
+    return [(oc_trials[num], jp_trials[num]) for num in sorted(oc_trials, key=int) if num in jp_trials]
+
 
-    last_name = Path(file_name).stem
-    pp_f.save_mae_to_file(last_name,cp_directory,pos_mae,vel_mae,acc_mae)
+JUMP_METRICS_FILE = "jump_metrics.csv"
 
+# Métricas de salto de todos os arquivos ACP de todos os voluntários, reunidas em uma
+# única tabela. Os arquivos de cada voluntário são analisados em lotes entre os processos
+def jump_metrics_analysis(executor,subjects,output_file):
+    tasks = [submit_tasks(executor, jm_f.jump_metrics_files,
+                          [(chunk,) for chunk in jm_f.file_chunks(subject["acp_file_list"])])
+             for subject in subjects]
 
+    tables = []
+    for subject, subject_tasks in zip(subjects, tasks):
+        for table in gather_results(subject_tasks):
+            table.insert(0, 'subject', os.path.basename(subject["session_directory"]))
+            tables.append(table)
 
-def main():
+    if not tables:
+        return None
+
+    metrics = pd.concat(tables, ignore_index=True)
+    metrics.to_csv(output_file, index=False)
+    print("Métricas de {n} saltos salvas em {path}".format(n=len(metrics), path=output_file))
+    return metrics
+
+
+COHORT_FILE       = "cohort_comparison.csv"
+COHORT_CHUNK_SIZE = 256
+
+# Comparação de todos os pares de ensaios de todos os voluntários em uma única tabela
+# (lag, MAE normalizado, RMSE, correlação e viés de cada canal e, com dtw_band, o MAE
+# normalizado após o alinhamento por DTW). Os pares são divididos
+# em lotes entre os processos; em cada lote as métricas são calculadas sobre as janelas
+# empilhadas. cohort_pairs: (voluntário, nome, dados OpenCap, dados jumpy, taxa jumpy)
+def cohort_analysis(executor,cohort_pairs,output_file,resample_engine=pp_f.RESAMPLE_SINC,dtw_band=None):
+    chunks = [cohort_pairs[i:i + COHORT_CHUNK_SIZE] for i in range(0, len(cohort_pairs), COHORT_CHUNK_SIZE)]
+    tasks = submit_tasks(executor, co_f.compare_cohort,
+                         [([pair[1:] for pair in chunk], OC_SAMPLE_RATE, resample_engine, co_f.COHORT_WINDOW_TIME,
+                           dtw_band) for chunk in chunks])
+    tables = gather_results(tasks)
+
+    if not tables:
+        return None
+
+    cohort = pd.concat(tables, ignore_index=True)
+    cohort.insert(0, 'subject', [pair[0] for pair in cohort_pairs])
+    cohort.to_csv(output_file, index=False)
+    print("Comparação de {n} pares de ensaios salva em {path}".format(n=len(cohort), path=output_file))
+    return cohort
+
+
+######################### Execução paralela #########################
+
+# Inicialização de cada processo de trabalho. Cada processo mantém seu próprio
+# estado do OpenSim (modelos e logger), do subsistema de renderização e da instrumentação
+def init_worker(render_mode=render_f.RENDER_FULL, background_render=True, tracing=False):
+    osim.Logger.setLevelString('error')
+    render_f.configure(mode=render_mode, background=background_render)
+    trace_f.configure(tracing)
+
+
+# Executor do modo sequencial: executa a tarefa no processo atual e entrega o resultado
+# (ou a exceção) em um futuro já concluído, como o ProcessPoolExecutor
+class InlineExecutor(Executor):
+
+    def submit(self, function, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(function(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def create_executor(workers):
+    if workers is None or workers <= 1:
+        return InlineExecutor()
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                               initargs=(render_f.render_config["mode"], render_f.render_config["background"],
+                                         trace_f.tracing_enabled()))
+
+
+# Resultado de uma tarefa acompanhado dos spans registrados durante sua execução
+class TaskResult:
+    __slots__ = ("value", "spans")
+
+    def __init__(self, value, spans):
+        self.value = value
+        self.spans = spans
+
+
+# Executa uma tarefa sem aguardar os gráficos que ela agendou: o processo segue para a
+# próxima tarefa enquanto a thread de fundo codifica os arquivos PNG, concluídos ao fim
+# do processo (render_f.flush). Os spans de renderização já concluídos seguem com o resultado
+def run_task(function,*args):
+    return TaskResult(function(*args), trace_f.collect())
+
+
+# Tarefa de um ensaio, instrumentada como um span da categoria "trial"
+def run_trial(key,subject_name,function,*args):
+    with trace_f.span(key, trace_f.TRIAL_CATEGORY, subject=subject_name):
+        return function(*args)
+
+
+# Envia uma tarefa ao executor e retorna seu futuro
+def submit_task(executor,function,*args):
+    return executor.submit(run_task,function,*args)
+
+
+# Envia as tarefas ao executor e retorna os futuros na ordem de envio.
+def submit_tasks(executor,function,tasks):
+    return [submit_task(executor,function,*task) for task in tasks]
+
+
+# Coleta os resultados na mesma ordem em que as tarefas foram enviadas, incorporando
+# os spans registrados pelos processos de trabalho
+def gather_results(futures):
+    values = []
+    for future in futures:
+        result = future.result()
+        trace_f.merge(result.spans)
+        values.append(result.value)
+    return values
+
+
+######################### Cache de resultados #########################
+
+# Envia a tarefa de um ensaio, a menos que o manifesto do voluntário indique que suas
+# entradas e parâmetros não mudaram desde a última execução
+def submit_cached_task(executor,subject,key,inputs,params,function,*args,cacheable=True):
+    cached = None
+    if subject["use_cache"] and cacheable:
+        cached = cache_f.lookup(subject["cached_trials"], key, inputs, params, subject["session_directory"])
+    if cached is not None:
+        print("[{key}] Sem alterações, resultado reaproveitado".format(key=key))
+        outputs, result = cached
+        future = Future()
+        future.set_result(TaskResult((outputs, result, None), []))
+    else:
+        future = submit_task(executor,run_trial,key,os.path.basename(subject["session_directory"]),function,*args)
+    return {"key": key, "inputs": inputs, "params": params, "result": future}
+
+
+# Coleta as tarefas de ensaio e registra seus resultados no novo manifesto do voluntário.
+# Um ensaio que falha (ex: massa ou taxa de amostragem não resolvidas) é registrado
+# nas falhas do voluntário, sem interromper a execução, e seu resultado é None
+def gather_cached_tasks(subject,tasks):
+    results = []
+    for task in tasks:
+        try:
+            outputs, result, data = gather_results([task["result"]])[0]
+        except Exception as e:
+            print("[{key}] Falha: {erro}".format(key=task["key"], erro=e))
+            subject["failures"].append({"key": task["key"], "error": "{tipo}: {erro}".format(tipo=type(e).__name__, erro=e)})
+            results.append(None)
+            continue
+        cache_f.record(subject["trials"], task["key"], task["inputs"], task["params"],
+                       outputs, result, subject["session_directory"])
+        results.append((outputs, result, data))
+    return results
+
+
+# Dados dos ensaios de análise indexados pelo número do ensaio. Ensaios reaproveitados
+# do cache são lidos do arquivo intermediário gravado na execução anterior, com a taxa
+# de amostragem e o tipo de salto registrados no manifesto
+def collect_trials(source_files, results):
+    trials = {}
+    for source_file, trial_result in zip(source_files, results):
+        if trial_result is None:
+            continue
+        outputs, result, data = trial_result
+        if data is None:
+            data_file = outputs[0]
+            data = trial_data(source_file, Path(data_file).with_suffix(".txt").name,
+                              pp_f.load_data_from_file(data_file), **(result or {}))
+        if data["trial"] is not None:
+            trials[data["trial"]] = data
+    return trials
+
+
+# Números dos ensaios cuja tarefa falhou
+def failed_trials(source_files, results):
+    return {trial_number(source_file) for source_file, result in zip(source_files, results) if result is None}
+
+
+FAILURES_FILE = "failures.csv"
+
+# Falhas de todos os voluntários, reunidas em uma tabela para revisão após execuções
+# sem acompanhamento. O arquivo de uma execução anterior é removido se não houver falhas
+def save_failures(subjects, output_file):
+    failures = [dict(subject=os.path.basename(subject["session_directory"]), **failure)
+                for subject in subjects for failure in subject["failures"]]
+    if not failures:
+        if os.path.exists(output_file):
+            delete_file(output_file)
+        return failures
+
+    pd.DataFrame(failures, columns=["subject", "key", "error"]).to_csv(output_file, index=False)
+    print("{n} ensaio(s) com falha, listados em {path}".format(n=len(failures), path=output_file))
+    return failures
+
+
+# Identificador do ensaio no banco de resultados: o número no final do nome do
+# arquivo de origem ou, na falta dele, o próprio nome
+def results_trial(file_path):
+    return trial_number(file_path) or Path(file_path).stem
+
+
+# Métricas de salto (--metrics) no banco de resultados, com o tipo de cada salto
+def add_jump_metrics_results(results, metrics):
+    metrics = metrics.assign(trial=metrics['file'].map(results_trial))
+    for subject, trial, jump_type in zip(metrics['subject'], metrics['trial'], metrics['jump_type']):
+        results.add_trial(subject, trial, jump_type)
+    results.add_table(metrics, res_f.SOURCE_JUMP_METRICS, skip_columns=['file'])
+
+
+# Comparação em lote (--cohort) no banco de resultados: colunas "<canal>_<métrica>"
+# separadas em canal e métrica
+def add_cohort_results(results, cohort):
+    cohort = cohort.assign(trial=cohort['trial'].map(results_trial))
+    results.add_table(cohort, res_f.SOURCE_COHORT, channels=co_f.CHANNELS)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Análise e comparação de dados OpenCap e jumpy")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="Número de processos paralelos (1 executa sequencialmente)")
+    parser.add_argument("--render", choices=render_f.RENDER_MODES, default=render_f.RENDER_FULL,
+                        help="Gráficos em resolução final (full), prévia em baixa resolução (preview) ou nenhum (none)")
+    parser.add_argument("--no-background-render", action="store_true",
+                        help="Renderiza os gráficos na mesma thread do cálculo")
+    parser.add_argument("--resample", choices=pp_f.RESAMPLE_ENGINES, default=pp_f.RESAMPLE_SINC,
+                        help="Método de reamostragem dos dados da plataforma para a taxa do OpenCap")
+    parser.add_argument("--export-csv", action="store_true",
+                        help="Exporta também os arquivos intermediários em texto (.txt)")
+    parser.add_argument("--no-intermediates", action="store_true",
+                        help="Não grava os arquivos intermediários; os dados seguem em memória para a comparação")
+    parser.add_argument("--export-mae", action="store_true",
+                        help="Grava também o MAE de cada par em um arquivo de texto (output/compare/mae_*.txt)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Reprocessa todos os ensaios, mesmo os que não foram alterados")
+    parser.add_argument("--trace", metavar="ARQUIVO",
+                        help="Registra o tempo de cada etapa por ensaio e grava os spans em JSON")
+    parser.add_argument("--chrome-trace", metavar="ARQUIVO",
+                        help="Grava os spans no formato de eventos do Chrome (chrome://tracing, Perfetto)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Extrai as métricas de salto de todos os arquivos ACP (data/" + JUMP_METRICS_FILE + ")")
+    parser.add_argument("--cohort", action="store_true",
+                        help="Compara todos os pares de ensaios em lote (data/" + COHORT_FILE + ")")
+    parser.add_argument("--dtw-band", type=int, metavar="N",
+                        help="Inclui na comparação em lote o alinhamento por DTW com banda de N amostras "
+                             "(padrão sugerido: " + str(dtw_f.DTW_BAND) + "); implica --cohort")
+    args = parser.parse_args()
+    if args.dtw_band is not None and args.dtw_band < 0:
+        parser.error("--dtw-band deve ser maior ou igual a zero")
+    return args
+
+
+def main(workers=1, render_mode=render_f.RENDER_FULL, background_render=True, use_cache=True, export_csv=False,
+         save_intermediates=True, resample_engine=pp_f.RESAMPLE_SINC, jump_metrics=False, trace_file=None,
+         chrome_trace_file=None, cohort=False, dtw_band=None, export_mae=False):
     start_time = time.time()
 
+    render_f.configure(mode=render_mode, background=background_render)
+    trace_f.configure(trace_file is not None or chrome_trace_file is not None)
+
     main_dir = dirname(abspath(__file__))
     data_path           = os.path.join(main_dir,"data")
     
@@ -192,8 +516,9 @@ def main():
     
     analyize_file_path  = "tmp/analyze_setup.xml"
 
-    opencap_directory_list = list_directories(data_path)
+    opencap_directory_list = sorted(list_directories(data_path))
 
+    subjects = []
 
     for directory in opencap_directory_list:
 
@@ -202,7 +527,7 @@ def main():
         oc_output_directory = os.path.join(output_directory,"opencap_com")
         cp_output_directory = os.path.join(output_directory,"compare")
         jp_output_directory = os.path.join(output_directory,"jumpy_kinematics")
-        
+    
         os.makedirs(output_directory,    exist_ok=True) 
         os.makedirs(oc_output_directory, exist_ok=True) 
         os.makedirs(cp_output_directory, exist_ok=True) 
@@ -210,39 +535,150 @@ def main():
 
         oc_directory       = os.path.join(data_path,directory,"opencap")
         jp_directory       = os.path.join(data_path,directory,"jumpy")
-        
-        movement_directory = os.path.join(oc_directory, "OpenSimData", "Kinematics")
-
-        mot_file_list           = list_files(movement_directory,".mot")
-        acp_file_list           = list_files(jp_directory,".acp")  
-
-
-        # Análise
-        mot_file_com_analysis(mot_file_list,oc_directory,oc_output_directory)
-        jp_sample_rate = jumpy_file_analisys(acp_file_list,jp_output_directory)
-
-        # Comparação
-        file_pairs = file_pairing(oc_output_directory, jp_output_directory)
-
-        if not file_pairs:
-            continue
     
+        movement_directory = os.path.join(oc_directory, "OpenSimData", "Kinematics")
 
-        for oc_file,jp_file in file_pairs:
-
-            oc_data = pp_f.load_data_from_file(oc_file)
-            jp_data = pp_f.load_data_from_file(jp_file)
-            
-            file_name = Path(oc_file).stem + "_" + Path(jp_file).stem + ".jpg"
-
-            plot_signals(oc_data,jp_data,cp_output_directory,file_name,jp_sample_rate)
-
-
+        session_directory  = os.path.join(data_path,directory)
+
+        subjects.append({
+            "session_directory":   session_directory,
+            "use_cache":           use_cache,
+            "cached_trials":       cache_f.load_manifest(session_directory),
+            "trials":              {},
+            "failures":            [],
+            "model_file":          os.path.join(oc_directory, "OpenSimData", "Model", osim_f.MODEL + ".osim"),
+            "oc_directory":        oc_directory,
+            "oc_output_directory": oc_output_directory,
+            "jp_output_directory": jp_output_directory,
+            "cp_output_directory": cp_output_directory,
+            "mot_file_list":       sorted(list_files(movement_directory,".mot")),
+            "acp_file_list":       sorted(list_files(jp_directory,".acp")),
+        })
+
+    # Parâmetros que invalidam os resultados em cache quando alterados
+    oc_params = {"model": osim_f.MODEL, "cutoff_frequency": OC_CUTOFF_FREQUENCY, "render": render_mode,
+                 "intermediates": save_intermediates, "export_csv": export_csv}
+    jp_params = {"filter_type": jp_f.FILTER_TYPE, "cutoff_frequency": jp_f.FILTER_CUTOFF_FREQUENCY,
+                 "filter_order": jp_f.FILTER_ORDER, "render": render_mode,
+                 "intermediates": save_intermediates, "export_csv": export_csv}
+
+    # Métricas da execução, gravadas ao final em uma única transação no banco de resultados
+    results = res_f.ResultsBatch({"workers": workers, "render": render_mode, "resample": resample_engine,
+                                  "oc_sample_rate": OC_SAMPLE_RATE, "oc_params": oc_params, "jp_params": jp_params,
+                                  "jump_metrics": jump_metrics, "cohort": cohort, "dtw_band": dtw_band})
+
+    executor = create_executor(workers)
+    try:
+        # Análise: todos os ensaios de todos os voluntários são distribuídos entre os processos.
+        # Sem arquivos intermediários não há de onde recuperar os dados de um ensaio em
+        # cache, então a análise é sempre refeita
+        mot_tasks = [
+            [submit_cached_task(executor, subject, "opencap:" + Path(mot_file_path).name,
+                                cache_f.input_hashes([mot_file_path] + [f for f in [subject["model_file"]] if os.path.exists(f)],
+                                                     subject["session_directory"]),
+                                oc_params,
+                                mot_trial_com_analysis,
+                                mot_file_path, subject["oc_directory"], subject["oc_output_directory"], export_csv,
+                                save_intermediates,
+                                cacheable=save_intermediates)
+             for mot_file_path in subject["mot_file_list"]]
+            for subject in subjects
+        ]
+        acp_tasks = [
+            [submit_cached_task(executor, subject, "jumpy:" + Path(acp_file_path).name,
+                                cache_f.input_hashes([acp_file_path] + meta_f.existing_registry_files(acp_file_path),
+                                                     subject["session_directory"]),
+                                jp_params,
+                                jumpy_trial_analysis,
+                                acp_file_path, subject["jp_output_directory"], export_csv, save_intermediates,
+                                cacheable=save_intermediates)
+             for acp_file_path in subject["acp_file_list"]]
+            for subject in subjects
+        ]
 
+        # Comparação: os dados da análise seguem em memória, pareados pelo número do ensaio
+        compare_tasks = []
+        compare_trials = []
+        cohort_pairs = []
+        for subject, mot_task, acp_task in zip(subjects, mot_tasks, acp_tasks):
+            mot_results = gather_cached_tasks(subject, mot_task)
+            acp_results = gather_cached_tasks(subject, acp_task)
+            oc_trials = collect_trials(subject["mot_file_list"], mot_results)
+            jp_trials = collect_trials(subject["acp_file_list"], acp_results)
+            failed = failed_trials(subject["mot_file_list"], mot_results) | \
+                     failed_trials(subject["acp_file_list"], acp_results)
+
+            trial_pairs = trial_pairing(oc_trials, jp_trials, failed)
+
+            tasks = []
+            trials = []
+            for oc_trial, jp_trial in trial_pairs or []:
+                file_name = compare_file_name(oc_trial["name"], jp_trial["name"])
+                if cohort:
+                    cohort_pairs.append((os.path.basename(subject["session_directory"]), Path(file_name).stem,
+                                         oc_trial["data"], jp_trial["data"], jp_trial["sample_rate"]))
+                cp_params = {"oc_sample_rate": OC_SAMPLE_RATE, "jp_sample_rate": jp_trial["sample_rate"],
+                             "resample": resample_engine, "render": render_mode, "export_mae": export_mae}
+                cp_inputs = {"opencap": cache_f.array_hash(oc_trial["data"]),
+                             "jumpy":   cache_f.array_hash(jp_trial["data"])}
+                tasks.append(submit_cached_task(executor, subject, "compare:" + file_name,
+                                                cp_inputs, cp_params,
+                                                compare_trial,
+                                                oc_trial["data"], jp_trial["data"], subject["cp_output_directory"],
+                                                file_name, jp_trial["sample_rate"], resample_engine, export_mae))
+                trials.append(jp_trial)
+            compare_tasks.append(tasks)
+            compare_trials.append(trials)
+
+        for subject, compare_task, trials in zip(subjects, compare_tasks, compare_trials):
+            subject_name = os.path.basename(subject["session_directory"])
+            for jp_trial, trial_result in zip(trials, gather_cached_tasks(subject, compare_task)):
+                if trial_result is None or trial_result[1] is None:
+                    continue
+                trial = results_trial(jp_trial["file"])
+                results.add_trial(subject_name, trial, jp_trial["jump_type"])
+                for channel, mae in trial_result[1].items():
+                    results.add(subject_name, trial, res_f.SOURCE_COMPARE, {"nmae": mae}, channel)
+            cache_f.save_manifest(subject["session_directory"], subject["trials"])
+
+        save_failures(subjects, os.path.join(data_path, FAILURES_FILE))
+
+        if jump_metrics:
+            with trace_f.span("run.jump_metrics", "run"):
+                metrics = jump_metrics_analysis(executor, subjects, os.path.join(data_path, JUMP_METRICS_FILE))
+            if metrics is not None:
+                add_jump_metrics_results(results, metrics)
+
+        if cohort:
+            with trace_f.span("run.cohort", "run"):
+                cohort_table = cohort_analysis(executor, cohort_pairs, os.path.join(data_path, COHORT_FILE),
+                                               resample_engine, dtw_band)
+            if cohort_table is not None:
+                add_cohort_results(results, cohort_table)
+    finally:
+        executor.shutdown()
+
+    # Gráficos pendentes do processo principal (execução sequencial)
+    render_f.flush()
+
+    results.save(os.path.join(data_path, res_f.RESULTS_FILE))
 
     delete_file(analyize_file_path)
     end_time = time.time()
     print("Tempo de execução:",end_time - start_time)
 
+    if trace_f.tracing_enabled():
+        spans = trace_f.collect()
+        trace_f.print_summary(spans)
+        if trace_file is not None:
+            print("Spans gravados em", trace_f.export_json(trace_file, spans))
+        if chrome_trace_file is not None:
+            print("Trace gravado em", trace_f.export_chrome_trace(chrome_trace_file, spans))
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    main(workers=args.workers, render_mode=args.render, background_render=not args.no_background_render,
+         use_cache=not args.no_cache, export_csv=args.export_csv, save_intermediates=not args.no_intermediates,
+         resample_engine=args.resample, jump_metrics=args.metrics, trace_file=args.trace,
+         chrome_trace_file=args.chrome_trace, cohort=args.cohort or args.dtw_band is not None,
+         dtw_band=args.dtw_band, export_mae=args.export_mae)
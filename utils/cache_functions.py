@@ -0,0 +1,86 @@
+# Arquivo: cache_functions.py
+#
+# :: Cache de resultados endereçado por conteúdo
+# :: Cada diretório de voluntário mantém um manifesto que associa cada ensaio ao hash
+# :: de seus arquivos de entrada e aos parâmetros de análise. Ensaios cujas entradas,
+# :: parâmetros e arquivos de saída não mudaram são ignorados em novas execuções
+
+import os
+import json
+import hashlib
+import numpy as np
+
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+
+def file_hash(file_path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Hash do conteúdo de um array em memória (dados, forma e dtype)
+def array_hash(array):
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256()
+    digest.update(str((array.shape, array.dtype.str)).encode())
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+# Hash dos arquivos de entrada, com caminhos relativos ao diretório do voluntário
+def input_hashes(file_paths, session_directory):
+    return {os.path.relpath(path, session_directory): file_hash(path) for path in file_paths}
+
+
+def manifest_path(session_directory):
+    return os.path.join(session_directory, "output", MANIFEST_NAME)
+
+
+def load_manifest(session_directory):
+    try:
+        with open(manifest_path(session_directory), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("trials", {})
+
+
+# Grava o manifesto de forma atômica (arquivo temporário + substituição)
+def save_manifest(session_directory, trials):
+    path = manifest_path(session_directory)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"version": MANIFEST_VERSION, "trials": trials}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# Retorna (saídas, resultado) de um ensaio já processado com as mesmas entradas e
+# parâmetros, ou None se ele precisar ser processado novamente
+def lookup(trials, key, inputs, params, session_directory):
+    entry = trials.get(key)
+    if entry is None:
+        return None
+    if entry.get("inputs") != inputs or entry.get("params") != params:
+        return None
+
+    outputs = [os.path.join(session_directory, path) for path in entry.get("outputs", [])]
+    if not all(os.path.exists(path) for path in outputs):
+        return None
+
+    return outputs, entry.get("result")
+
+
+def record(trials, key, inputs, params, outputs, result, session_directory):
+    trials[key] = {
+        "inputs":  inputs,
+        "params":  params,
+        "outputs": [os.path.relpath(path, session_directory) for path in outputs],
+        "result":  result,
+    }
@@ -0,0 +1,176 @@
+# Arquivo: cohort_functions.py
+#
+# :: Comparação OpenCap x plataforma de força de vários pares de ensaios de uma vez
+# :: As janelas recortadas de todos os pares de uma sessão (ou de todos os voluntários)
+# :: são empilhadas em matrizes (pares x canais x amostras), completadas com NaN, com
+# :: uma máscara das amostras válidas. Lag, sincronização e métricas (MAE normalizado,
+# :: RMSE, correlação de Pearson e viés) são calculados com operações sobre a matriz
+# :: inteira, com os mesmos critérios de plot_signals (main.py).
+# :: Opcionalmente, após a sincronização pelo lag, cada canal é realinhado por DTW com
+# :: banda (dtw_functions) e o MAE é recalculado ao longo do caminho
+
+import numpy as np
+import pandas as pd
+import utils.post_process_functions as pp_f
+import utils.dtw_functions as dtw_f
+
+
+# Janela recortada em torno da maior altura, como em crop_signal (s)
+COHORT_WINDOW_TIME = 6
+# Amostras do OpenCap usadas para a altura inicial do centro de massa, como em exract_com_height_oc
+COM_HEIGHT_SAMPLES = 60
+
+# Colunas dos dados de um ensaio (tempo, posição, velocidade, aceleração)
+TIME, POS, VEL, ACC = 0, 1, 2, 3
+CHANNELS = ['pos', 'vel', 'acc']
+METRICS = ['nmae', 'rmse', 'r', 'bias']
+
+DTW_METRICS = ['dtw_nmae', 'dtw_max_warp']
+
+COHORT_COLUMNS = ['trial', 'lag', 'overlap'] + [channel + '_' + metric for channel in CHANNELS for metric in METRICS]
+DTW_COLUMNS = [channel + '_' + metric for channel in CHANNELS for metric in DTW_METRICS]
+
+
+######################### Empilhamento #########################
+
+# Empilha os ensaios (amostras x colunas, tamanhos diferentes) em uma matriz
+# (ensaios x colunas x amostras) completada com NaN
+def stack_signals(trials):
+    lengths = np.array([len(trial) for trial in trials])
+    stacked = np.full((len(trials), trials[0].shape[1], lengths.max()), np.nan)
+    for i, trial in enumerate(trials):
+        stacked[i, :, :lengths[i]] = np.asarray(trial).T
+    return stacked, lengths
+
+
+# Recorte de todos os ensaios e canais em uma única indexação. Mesmo resultado de
+# crop_signal aplicado a cada linha: amostras fora do sinal ficam NaN
+def crop_windows(signals, lengths, centers, window_size):
+    half_size = window_size // 2
+    columns = np.arange(window_size)
+    index = centers[:, np.newaxis] - half_size + columns
+    valid = (index >= 0) & (index < lengths[:, np.newaxis]) & (columns < 2 * half_size)
+
+    rows = np.arange(signals.shape[0])[:, np.newaxis]
+    windows = signals[rows, :, np.clip(index, 0, signals.shape[-1] - 1)]   # (ensaios x janela x canais)
+    windows = np.where(valid[:, :, np.newaxis], windows, np.nan)
+    return np.moveaxis(windows, -1, 1)
+
+
+# Desloca cada linha `shift` amostras para a esquerda (ao longo do último eixo),
+# completando o final com NaN
+def shift_left(windows, shift):
+    columns = np.arange(windows.shape[-1])
+    index = columns + shift.reshape(shift.shape + (1,) * (windows.ndim - shift.ndim))
+    valid = index < windows.shape[-1]
+    shifted = np.take_along_axis(windows, np.clip(index, 0, windows.shape[-1] - 1), axis=-1)
+    return np.where(valid, shifted, np.nan)
+
+
+# Janelas com as amostras válidas no início de cada linha, equivalente a remover os
+# NaN de cada sinal antes da correlação (como em calculate_lag). O trecho válido de
+# uma janela recortada é contíguo
+def left_align(windows):
+    valid = ~np.isnan(windows)
+    first = np.where(valid.any(axis=-1), np.argmax(valid, axis=-1), 0)
+    return shift_left(windows, first)
+
+
+# Sincronização de todos os pares e canais, como em sync_signals: lag positivo
+# descarta o início da janela do OpenCap, lag negativo o da plataforma de força
+def sync_windows(oc_windows, fp_windows, lags):
+    lags = np.asarray(lags, dtype=int)
+    oc_shift = np.clip(lags, 0, None)[:, np.newaxis]
+    fp_shift = np.clip(-lags, 0, None)[:, np.newaxis]
+    return shift_left(oc_windows, np.broadcast_to(oc_shift, oc_windows.shape[:2])), \
+           shift_left(fp_windows, np.broadcast_to(fp_shift, fp_windows.shape[:2]))
+
+
+######################### Métricas #########################
+
+# Métricas de cada par e canal sobre as amostras válidas nos dois sinais.
+# O MAE é normalizado pela amplitude (pico a vale) da plataforma de força, como em normalized_mae
+def window_metrics(oc_windows, fp_windows):
+    mask = ~np.isnan(oc_windows) & ~np.isnan(fp_windows)
+    count = mask.sum(axis=-1)
+    oc = np.where(mask, oc_windows, 0.0)
+    fp = np.where(mask, fp_windows, 0.0)
+    error = fp - oc
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        amplitude = np.where(mask, fp_windows, -np.inf).max(axis=-1) - np.where(mask, fp_windows, np.inf).min(axis=-1)
+        amplitude = np.where((count > 0) & (amplitude > 0), amplitude, np.nan)
+
+        bias = error.sum(axis=-1) / count
+        mae = np.abs(error).sum(axis=-1) / count
+        rmse = np.sqrt((error ** 2).sum(axis=-1) / count)
+
+        oc_centered = np.where(mask, oc - (oc.sum(axis=-1) / count)[..., np.newaxis], 0.0)
+        fp_centered = np.where(mask, fp - (fp.sum(axis=-1) / count)[..., np.newaxis], 0.0)
+        r = (oc_centered * fp_centered).sum(axis=-1) / \
+            np.sqrt((oc_centered ** 2).sum(axis=-1) * (fp_centered ** 2).sum(axis=-1))
+
+    return {'nmae': mae / amplitude, 'rmse': rmse, 'r': r, 'bias': bias, 'overlap': count}
+
+
+######################### Comparação #########################
+
+# Compara pares (OpenCap, plataforma de força) já na mesma taxa de amostragem.
+# oc_trials e fp_trials: listas de arrays (amostras x [tempo, posição, velocidade, aceleração]).
+# Retorna os lags e as métricas (pares x canais). Com dtw_band, inclui o MAE normalizado
+# após o alinhamento por DTW, o maior deslocamento do caminho e os caminhos ("dtw")
+def compare_windows(oc_trials, fp_trials, sample_rate, window_time=COHORT_WINDOW_TIME, dtw_band=None):
+    window_size = int(window_time * sample_rate)
+
+    oc_signals, oc_lengths = stack_signals(oc_trials)
+    fp_signals, fp_lengths = stack_signals(fp_trials)
+
+    # Altura inicial do centro de massa (OpenCap) somada ao deslocamento da plataforma
+    com_height = np.nanmean(oc_signals[:, POS, :COM_HEIGHT_SAMPLES], axis=-1)
+
+    # Recorte utilizando o ponto de maior altura como ponto médio
+    oc_windows = crop_windows(oc_signals[:, POS:], oc_lengths,
+                              np.nanargmax(oc_signals[:, POS], axis=-1), window_size)
+    fp_windows = crop_windows(fp_signals[:, POS:], fp_lengths,
+                              np.nanargmax(fp_signals[:, POS], axis=-1), window_size)
+    fp_windows[:, 0] += com_height[:, np.newaxis]
+
+    # Lag pela correlação das posições, todos os pares em uma única FFT
+    lags = pp_f.calculate_lags(left_align(oc_windows[:, 0]), left_align(fp_windows[:, 0]))
+
+    oc_synced, fp_synced = sync_windows(oc_windows, fp_windows, lags)
+    metrics = window_metrics(oc_synced, fp_synced)
+    metrics['lag'] = lags
+
+    if dtw_band is not None:
+        dtw = dtw_f.warp_nmae(oc_synced, fp_synced, dtw_band)
+        metrics['dtw_nmae'] = dtw['nmae']
+        metrics['dtw_max_warp'] = dtw['max_warp']
+        metrics['dtw'] = dtw
+
+    return metrics
+
+
+# Reamostra os dados da plataforma de cada par para a taxa do OpenCap e compara todos
+# os pares. pairs: lista de (nome, dados OpenCap, dados da plataforma, taxa da plataforma)
+def compare_cohort(pairs, oc_sample_rate, resample_engine=pp_f.RESAMPLE_SINC, window_time=COHORT_WINDOW_TIME,
+                   dtw_band=None):
+    columns = COHORT_COLUMNS + (DTW_COLUMNS if dtw_band is not None else [])
+    if not pairs:
+        return pd.DataFrame(columns=columns)
+
+    oc_trials, fp_trials = [], []
+    for name, oc_data, jp_data, fp_sample_rate in pairs:
+        target_time = oc_data[:, TIME] if resample_engine == pp_f.RESAMPLE_INTERP else None
+        oc_trials.append(oc_data)
+        fp_trials.append(pp_f.downsample_multicolumn(jp_data, fp_sample_rate, oc_sample_rate,
+                                                     engine=resample_engine, target_time=target_time))
+
+    metrics = compare_windows(oc_trials, fp_trials, oc_sample_rate, window_time, dtw_band)
+
+    table = {'trial': [pair[0] for pair in pairs], 'lag': metrics['lag'], 'overlap': metrics['overlap'][:, 0]}
+    for c, channel in enumerate(CHANNELS):
+        for metric in METRICS + (DTW_METRICS if dtw_band is not None else []):
+            table[channel + '_' + metric] = metrics[metric][:, c]
+
+    return pd.DataFrame(table, columns=columns)
@@ -0,0 +1,77 @@
+# Arquivo: columnar_functions.py
+#
+# :: Formato binário colunar dos arquivos intermediários
+# :: Cada arquivo é um array .npy (amostras x colunas, float64) acompanhado de um
+# :: .json com nomes das colunas, dtype e taxa de amostragem. O .npy pode ser lido
+# :: por memory-map e não perde precisão como a gravação em texto com '%f'.
+# :: A exportação em texto (CSV) é opcional
+
+import os
+import json
+import numpy as np
+
+
+COLUMNAR_EXTENSION = ".npy"
+METADATA_EXTENSION = ".json"
+FORMAT_VERSION = 1
+
+
+def metadata_path(data_path):
+    return os.path.splitext(data_path)[0] + METADATA_EXTENSION
+
+
+def columnar_path(file_path):
+    return os.path.splitext(file_path)[0] + COLUMNAR_EXTENSION
+
+
+# Grava as colunas e os metadados. Retorna os caminhos dos arquivos gravados
+def write_columns(data_path, data, columns, sample_rate, **metadata):
+    data = np.ascontiguousarray(data, dtype=np.float64)
+    if data.ndim != 2 or data.shape[1] != len(columns):
+        raise ValueError("O número de colunas não corresponde aos nomes: {shape} x {columns}".format(
+            shape=data.shape, columns=columns))
+
+    meta_path = metadata_path(data_path)
+    meta = dict(metadata)
+    meta.update({
+        "version":     FORMAT_VERSION,
+        "columns":     list(columns),
+        "dtype":       str(data.dtype),
+        "shape":       list(data.shape),
+        "sample_rate": sample_rate,
+    })
+
+    np.save(data_path, data)
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    return [data_path, meta_path]
+
+
+def read_metadata(data_path):
+    with open(metadata_path(data_path), 'r') as f:
+        return json.load(f)
+
+
+# Lê o array (por memory-map, por padrão) e seus metadados
+def read_columns(data_path, mmap=True):
+    data = np.load(data_path, mmap_mode='r' if mmap else None)
+    return data, read_metadata(data_path)
+
+
+# Dicionário nome da coluna -> view da coluna
+def column_views(data, columns):
+    return {name: data[:, i] for i, name in enumerate(columns)}
+
+
+# Exportação opcional em texto, no formato usado anteriormente pelos arquivos intermediários
+def export_csv(file_path, data, columns):
+    np.savetxt(
+        file_path,
+        data,
+        delimiter=',',
+        fmt='%f',
+        header=','.join(columns),
+        comments=''
+    )
+    return [file_path]
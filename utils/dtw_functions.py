@@ -0,0 +1,202 @@
+# Arquivo: dtw_functions.py
+#
+# :: Alinhamento por DTW (dynamic time warping) com banda de Sakoe-Chiba
+# :: Alternativa ao lag único de calculate_lag/sync_signals: cada amostra de um sinal
+# :: pode ser pareada com amostras do outro deslocadas em até `band` amostras, de modo
+# :: que diferenças de tempo não lineares (ex: ao longo do contramovimento) não sejam
+# :: contadas como erro de amplitude.
+# :: A matriz de custo acumulado é percorrida por antidiagonais (i + j constante) apenas
+# :: dentro da banda (custo O(n·banda)), para vários pares de sinais de uma vez. As
+# :: células de uma antidiagonal dependem apenas das duas anteriores, então cada passo
+# :: é um conjunto fixo de operações elemento a elemento sobre (banda x pares), sem
+# :: varredura ao longo da linha.
+# :: O laço sobre as 2n antidiagonais (e o retorno pelo caminho) tem custo fixo por
+# :: passo, independente do número de pares: canais de 360 amostras com banda 30 levam
+# :: ~0.3 ms por canal com centenas de canais em uma chamada (como em compare_windows,
+# :: que alinha todos os pares x canais da coorte de uma vez), ~0.9 ms com uma dezena e
+# :: ~8 ms para um canal isolado
+
+import numpy as np
+
+
+# Deslocamento máximo entre amostras pareadas (amostras; 0.5 s a 60 Hz)
+DTW_BAND = 30
+# Antidiagonais com custo local calculado por vez (memória: antidiagonais x banda x pares)
+DTW_DIAGONAL_BLOCK = 128
+
+######################### DTW #########################
+
+# Índices (i, j) das células da banda em cada antidiagonal d = i + j. A posição s da
+# antidiagonal corresponde a i - j = 2s - band + q, com q = (d + band) % 2, de modo que
+# apenas as células com i - j de mesma paridade de d são representadas. Células fora
+# da matriz ou da banda apontam para a amostra `n` (NaN)
+def diagonal_cells(n, band):
+    d = np.arange(2 * n - 1)[:, np.newaxis]
+    offset = 2 * np.arange(band + 1) - band + (d + band) % 2
+    i = (d + offset) // 2
+    j = (d - offset) // 2
+    outside = (i < 0) | (j < 0) | (i >= n) | (j >= n) | (np.abs(offset) > band)
+    return np.where(outside, n, i), np.where(outside, n, j)
+
+
+# DTW de cada linha de x e y (pares x amostras), considerando as primeiras lengths[p]
+# amostras de cada par (as mesmas nos dois sinais) e |i - j| <= band.
+# O custo local é |x[i] - y[j]|. Retorna o custo total do caminho ótimo, o caminho
+# (índices i e j, completados com -1) e o número de passos de cada par
+def banded_dtw(x, y, lengths=None, band=DTW_BAND):
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    n_pairs, n = x.shape
+    if lengths is None:
+        lengths = np.full(n_pairs, n)
+    lengths = np.asarray(lengths, dtype=int)
+    band = int(band)
+    if band < 0:
+        raise ValueError("A banda do DTW deve ser maior ou igual a zero: {band}".format(band=band))
+    width = band + 1
+    n_diagonals = 2 * n - 1
+
+    # Sinais organizados como (amostras x pares), com uma amostra NaN ao final para as
+    # células fora da matriz. Amostras fora de lengths também ficam NaN e são excluídas
+    inside = np.arange(n) < lengths[:, np.newaxis]
+    x = np.vstack((np.where(inside, x, np.nan).T, np.full((1, n_pairs), np.nan)))
+    y = np.vstack((np.where(inside, y, np.nan).T, np.full((1, n_pairs), np.nan)))
+    cell_i, cell_j = diagonal_cells(n, band)
+
+    # Passos registrados (antidiagonais x banda x pares). Em empates, a preferência é
+    # diagonal, depois vertical (i-1, j), depois horizontal (i, j-1)
+    diagonal_first = np.empty((n_diagonals, width, n_pairs), dtype=bool)   # (i-1, j-1)
+    vertical_first = np.empty((n_diagonals, width, n_pairs), dtype=bool)   # (i-1, j) em vez de (i, j-1)
+    center = np.empty((n_diagonals, n_pairs))                               # Custo acumulado em i = j
+
+    # Antidiagonais d-2 e d-1, com uma posição infinita em cada extremo. Antidiagonal
+    # virtual -2: apenas (-1, -1) é alcançável, com custo 0
+    before = np.full((width + 2, n_pairs), np.inf)
+    before[1 + band // 2] = 0.0
+    previous = np.full((width + 2, n_pairs), np.inf)
+    step = np.empty((width, n_pairs))
+
+    for block_start in range(0, n_diagonals, DTW_DIAGONAL_BLOCK):
+        block = slice(block_start, min(block_start + DTW_DIAGONAL_BLOCK, n_diagonals))
+
+        # Custo local das células do bloco de antidiagonais (NaN = fora do caminho)
+        cost = np.abs(x[cell_i[block]] - y[cell_j[block]])
+        cost[np.isnan(cost)] = np.inf
+
+        for r, d in enumerate(range(block.start, block.stop)):
+            # Em relação à antidiagonal anterior, (i-1, j) e (i, j-1) estão nas posições
+            # s-1 e s (q = 0) ou s e s+1 (q = 1); (i-1, j-1), duas antidiagonais antes, em s
+            q = (d + band) % 2
+            vertical = previous[q:q + width]
+            horizontal = previous[q + 1:q + 1 + width]
+            diagonal = before[1:width + 1]
+
+            np.less_equal(vertical, horizontal, out=vertical_first[d])
+            np.minimum(vertical, horizontal, out=step)
+            np.less_equal(diagonal, step, out=diagonal_first[d])
+            np.minimum(diagonal, step, out=step)
+
+            # A antidiagonal d-2 não é mais necessária: seu espaço recebe a antidiagonal d
+            np.add(step, cost[r], out=before[1:width + 1])
+            before, previous = previous, before
+            center[d] = previous[1 + band // 2]
+
+    total = np.where(lengths > 0, center[np.clip(2 * lengths - 2, 0, None), np.arange(n_pairs)], np.inf)
+
+    path_i, path_j, path_length = backtrack(diagonal_first, vertical_first, lengths, band)
+    return {"cost": total, "path_i": path_i, "path_j": path_j, "path_length": path_length}
+
+
+# Caminho de cada par, de (0, 0) a (lengths-1, lengths-1), a partir dos passos
+# registrados. Cada célula recebe um código (passo e paridade da antidiagonal) que
+# indica o deslocamento até a célula anterior no array achatado; todos os pares são
+# percorridos juntos, com uma indexação por passo
+def backtrack(diagonal_first, vertical_first, lengths, band):
+    n_diagonals, width, n_pairs = diagonal_first.shape
+    max_length = n_diagonals + 1
+    diagonal_size = width * n_pairs
+
+    # Código: 2 * diagonal + vertical + 4 * paridade (q); 8 na origem (0, 0)
+    code = diagonal_first.view(np.int8) * np.int8(2)
+    code += vertical_first.view(np.int8)
+    code[1 - band % 2::2] += np.int8(4)
+    code[0, band // 2] = 8
+    code = code.reshape(-1)
+
+    # Deslocamento no array achatado: diagonal volta duas antidiagonais na mesma posição;
+    # vertical e horizontal voltam uma, na posição s-1/s (q = 0) ou s/s+1 (q = 1)
+    moves = np.array([-diagonal_size,           -diagonal_size - n_pairs, -2 * diagonal_size, -2 * diagonal_size,
+                      -diagonal_size + n_pairs, -diagonal_size,           -2 * diagonal_size, -2 * diagonal_size,
+                      0])
+
+    rows = np.arange(n_pairs)
+    origin = band // 2 * n_pairs + rows
+    cell = np.where(lengths > 0, (np.maximum(2 * lengths - 2, 0) * width + band // 2) * n_pairs + rows, origin)
+
+    cells = np.empty((max_length, n_pairs), dtype=cell.dtype)
+    cells[:] = origin
+    for t in range(max_length):
+        cells[t] = cell
+        if t % 32 == 0 and np.array_equal(cell, origin):
+            break
+        cell = cell + moves[code[cell]]
+
+    path_length = np.where(lengths > 0, (cells != origin).sum(axis=0) + 1, 0)
+
+    # Caminhos registrados do fim para o início: inverte o trecho válido de cada par e
+    # converte as células em índices (i, j)
+    steps = np.arange(max_length)[:, np.newaxis]
+    on_path = steps < path_length
+    cells = np.take_along_axis(cells, np.where(on_path, path_length - 1 - steps, 0), axis=0)
+    d = cells // diagonal_size
+    offset = 2 * (cells // n_pairs % width) - band + (d + band) % 2
+    path_i = np.where(on_path, (d + offset) // 2, -1).T
+    path_j = np.where(on_path, (d - offset) // 2, -1).T
+    return np.ascontiguousarray(path_i), np.ascontiguousarray(path_j), path_length
+
+
+######################### Métricas #########################
+
+# Trecho em que os dois sinais são válidos (não NaN), movido para o início de cada
+# linha. Os trechos válidos das janelas recortadas e sincronizadas são contíguos.
+# Retorna os trechos, seus tamanhos e a posição inicial de cada um na janela
+def overlap_segments(x, y):
+    mask = ~np.isnan(x) & ~np.isnan(y)
+    lengths = mask.sum(axis=-1)
+    start = np.where(lengths > 0, np.argmax(mask, axis=-1), 0)
+
+    columns = np.arange(x.shape[-1])
+    index = np.clip(columns + start[..., np.newaxis], 0, x.shape[-1] - 1)
+    inside = columns < lengths[..., np.newaxis]
+    x = np.where(inside, np.take_along_axis(x, index, axis=-1), np.nan)
+    y = np.where(inside, np.take_along_axis(y, index, axis=-1), np.nan)
+    return x, y, lengths, start
+
+
+# MAE após o alinhamento por DTW, normalizado pela amplitude (pico a vale) da plataforma
+# de força no trecho comparado, como em normalized_mae. oc_signals e fp_signals podem
+# ter qualquer número de dimensões, com o tempo no último eixo (NaN = fora do sinal).
+# O caminho é retornado em índices das janelas de entrada
+def warp_nmae(oc_signals, fp_signals, band=DTW_BAND):
+    shape = oc_signals.shape[:-1]
+    n = oc_signals.shape[-1]
+    oc, fp, lengths, start = overlap_segments(oc_signals.reshape(-1, n), fp_signals.reshape(-1, n))
+
+    dtw = banded_dtw(fp, oc, lengths, band)
+
+    valid = ~np.isnan(fp)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        amplitude = np.where(valid, fp, -np.inf).max(axis=-1) - np.where(valid, fp, np.inf).min(axis=-1)
+        amplitude = np.where((lengths > 0) & (amplitude > 0), amplitude, np.nan)
+        nmae = dtw["cost"] / dtw["path_length"] / amplitude
+
+    on_path = dtw["path_i"] >= 0
+    warp = np.where(on_path, np.abs(dtw["path_i"] - dtw["path_j"]), 0)
+
+    return {
+        "nmae":        nmae.reshape(shape),
+        "max_warp":    warp.max(axis=-1).reshape(shape),
+        "path_fp":     np.where(on_path, dtw["path_i"] + start[:, np.newaxis], -1).reshape(shape + (-1,)),
+        "path_oc":     np.where(on_path, dtw["path_j"] + start[:, np.newaxis], -1).reshape(shape + (-1,)),
+        "path_length": dtw["path_length"].reshape(shape),
+    }
@@ -0,0 +1,31 @@
+# Arquivo: filter_functions.py
+#
+# :: Banco de filtros compartilhado pelos dados do OpenCap e da plataforma de força
+# :: Os filtros são projetados em seções de segunda ordem (SOS), mais robustas
+# :: numericamente que a forma (b, a) em taxas altas e cortes baixos, e cada
+# :: projeto é feito uma vez por (tipo, ordem, corte, fs, banda)
+
+import numpy as np
+from functools import lru_cache
+from scipy import signal
+
+
+@lru_cache(maxsize=64)
+def sos_design(filter_type, order, cutoff_frequency, fs, band_type='lowpass'):
+    sos = signal.iirfilter(order, cutoff_frequency, btype=band_type, analog=False, ftype=filter_type,
+                           fs=fs, output='sos')
+    sos.setflags(write=False)
+    return sos
+
+
+# Taxa de amostragem a partir do vetor de tempo
+def sample_rate(time):
+    return 1/np.round(np.mean(np.diff(time)),16)
+
+
+# Filtragem de fase zero (ida e volta) de todos os canais em uma única chamada.
+# `data` pode ter qualquer número de dimensões; o tempo está ao longo de `axis`
+def zero_phase_filter(data, fs, cutoff_frequency, order, filter_type='butter', band_type='lowpass', axis=0):
+    sos = sos_design(filter_type, int(order), float(cutoff_frequency), float(fs), band_type)
+    # O projeto em cache é somente leitura; sosfiltfilt exige uma cópia gravável
+    return signal.sosfiltfilt(np.array(sos), data, axis=axis)
@@ -0,0 +1,178 @@
+# Arquivo: jump_metrics_functions.py
+#
+# :: Métricas de salto (CMJ/SJ) a partir das fases detectadas por find_phases_batch
+# :: (jumpy_functions, a mesma detecção de findPhases). Os ensaios são empilhados em
+# :: matrizes (ensaios x amostras), completadas com NaN, e cada evento é encontrado para
+# :: todos os ensaios de uma vez, com buscas mascaradas ao longo das linhas.
+# :: Conjuntos grandes de arquivos podem ser divididos entre processos
+
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import utils.jumpy_functions as jp_f
+import utils.trace_functions as trace_f
+import utils.metadata_functions as meta_f
+
+
+# Janela parada no início do registro usada para detectar o início do movimento (s)
+ONSET_QUIET_TIME    = 0.5
+# Desvios padrão da aceleração parada que caracterizam o início do movimento
+ONSET_THRESHOLD_SD  = 5
+
+# Arquivos por tarefa ao dividir a análise entre processos
+METRICS_CHUNK_SIZE  = 64
+
+METRICS_COLUMNS = [
+    'file', 'jump_type', 'mass', 'sample_rate',
+    'init_movement', 'end_unweighting', 'end_braking', 'end_propulsion', 'end_flight',
+    'takeoff_velocity', 'flight_time', 'jump_height_takeoff', 'jump_height_flight',
+    'propulsion_impulse', 'time_to_takeoff', 'rsi_modified',
+]
+
+
+######################### Ensaios #########################
+
+# Lê, filtra e integra um arquivo ACP, como em runAnalysisCMJSJ
+def load_trial(file_path):
+    fp_data, var_names, jump_type, mass, data_rate = jp_f.readForceFile(file_path)
+    time = fp_data['Time (s)']
+    force = fp_data['Raw Fz (N)']
+    mass, data_rate = meta_f.resolve(file_path, mass, data_rate, time, force)
+    fs = int(1/(time[1]-time[0]))
+
+    force = jp_f.filterForceSignal(time, force, fs, 'lowpass', jp_f.FILTER_TYPE,
+                                   jp_f.FILTER_CUTOFF_FREQUENCY, jp_f.FILTER_ORDER)
+    acel, vel, disp = jp_f.getAcelVelDisp(force, fs, mass)
+
+    return {
+        "file":      os.path.basename(file_path),
+        "jump_type": jump_type,
+        "mass":      mass,
+        "fs":        fs,
+        "time":      np.asarray(time),
+        "acel":      acel,
+        "vel":       vel,
+        "disp":      disp,
+    }
+
+
+# Empilha um sinal de todos os ensaios em uma matriz completada com NaN
+def stack_trials(trials, key):
+    lengths = np.array([len(trial[key]) for trial in trials])
+    stacked = np.full((len(trials), lengths.max()), np.nan)
+    for i, trial in enumerate(trials):
+        stacked[i, :lengths[i]] = trial[key]
+    return stacked, lengths
+
+
+######################### Fases #########################
+
+# Início do movimento: primeira amostra após a janela parada cuja aceleração se
+# afasta da média parada por mais de ONSET_THRESHOLD_SD desvios padrão
+def detect_onset(acel, lengths, fs):
+    quiet_end = np.minimum((ONSET_QUIET_TIME * fs).astype(int), lengths)
+    mean, std = jp_f.masked_mean_std(acel, np.zeros(len(lengths), dtype=int), quiet_end)
+    deviation = np.abs(acel - mean[:, np.newaxis]) > (ONSET_THRESHOLD_SD * std)[:, np.newaxis]
+    return jp_f.first_where(deviation, quiet_end, lengths)
+
+
+######################### Métricas #########################
+
+def jump_metrics_table(trials, phases, time, vel):
+    mass = np.array([trial["mass"] for trial in trials], dtype=float)
+
+    t = dict((key, jp_f.take(time, index)) for key, index in phases.items())
+    takeoff_velocity = jp_f.take(vel, phases['end_propulsion'])
+    flight_time = t['end_flight'] - t['end_propulsion']
+
+    # Impulso líquido da propulsão: integral trapezoidal da aceleração entre o fim da
+    # frenagem e a decolagem. vel[k-1] é a integral da aceleração até a amostra k
+    acel_integral = np.concatenate((np.zeros((len(trials), 1)), vel[:, :-1]), axis=1)
+    propulsion_impulse = mass * (jp_f.take(acel_integral, phases['end_propulsion']) -
+                                 jp_f.take(acel_integral, phases['end_braking']))
+
+    jump_height_flight = jp_f.g * flight_time ** 2 / 8
+    time_to_takeoff = t['end_propulsion'] - t['init_movement']
+
+    table = {
+        'file':        [trial["file"] for trial in trials],
+        'jump_type':   [trial["jump_type"] for trial in trials],
+        'mass':        mass,
+        'sample_rate': [trial["fs"] for trial in trials],
+    }
+    table.update(t)
+    table.update({
+        'takeoff_velocity':    takeoff_velocity,
+        'flight_time':         flight_time,
+        'jump_height_takeoff': takeoff_velocity ** 2 / (2 * jp_f.g),
+        'jump_height_flight':  jump_height_flight,
+        'propulsion_impulse':  propulsion_impulse,
+        'time_to_takeoff':     time_to_takeoff,
+        'rsi_modified':        jump_height_flight / time_to_takeoff,
+    })
+
+    return pd.DataFrame(table, columns=METRICS_COLUMNS)
+
+
+# Métricas de um conjunto de arquivos ACP em um único lote. Arquivos que não
+# puderem ser lidos (ou sem massa e taxa resolvíveis) são informados e ignorados
+def jump_metrics_files(file_paths):
+    with trace_f.span("jump_metrics.batch", "jumpy", files=len(file_paths)):
+        return jump_metrics_batch(file_paths)
+
+
+def jump_metrics_batch(file_paths):
+    trials = []
+    for file_path in file_paths:
+        try:
+            trials.append(load_trial(file_path))
+        except Exception as e:
+            print("Não foi possível analisar o arquivo {file_path}: {erro}".format(erro=e, file_path=file_path))
+
+    if not trials:
+        return pd.DataFrame(columns=METRICS_COLUMNS)
+
+    time, lengths = stack_trials(trials, "time")
+    acel, _ = stack_trials(trials, "acel")
+    vel, _ = stack_trials(trials, "vel")
+    disp, _ = stack_trials(trials, "disp")
+    fs = np.array([trial["fs"] for trial in trials], dtype=float)
+    cmj = np.array([trial["jump_type"] != "SJ" for trial in trials])
+
+    start = detect_onset(acel, lengths, fs)
+    phases = jp_f.find_phases_batch(acel, vel, disp, np.clip(start, 0, None), lengths, cmj)
+    phases['init_movement'] = np.where(start >= 0, phases['init_movement'], -1)
+
+    return jump_metrics_table(trials, phases, time, vel)
+
+
+# Tabela única de métricas de todos os arquivos, na ordem recebida. Os arquivos são
+# divididos em lotes de chunk_size, distribuídos entre os processos do executor
+# (ou de um executor criado com `workers` processos)
+def file_chunks(file_paths, chunk_size=METRICS_CHUNK_SIZE):
+    file_paths = list(file_paths)
+    return [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), max(chunk_size, 1))]
+
+
+def jump_metrics(file_paths, executor=None, workers=1, chunk_size=METRICS_CHUNK_SIZE):
+    chunks = file_chunks(file_paths, chunk_size)
+
+    if executor is None and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as own_executor:
+            return jump_metrics(file_paths, own_executor, chunk_size=chunk_size)
+
+    if executor is None:
+        tables = [jump_metrics_files(chunk) for chunk in chunks]
+    else:
+        futures = [executor.submit(jump_metrics_files, chunk) for chunk in chunks]
+        tables = [future.result() for future in futures]
+
+    if not tables:
+        return pd.DataFrame(columns=METRICS_COLUMNS)
+    return pd.concat(tables, ignore_index=True)
+
+
+def jump_metrics_directory(directory, extension=".acp", **kwargs):
+    file_paths = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(extension))
+    return jump_metrics(file_paths, **kwargs)
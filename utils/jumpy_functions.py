@@ -5,117 +5,204 @@
 # :: funcionalidades necessárias para a aplicação atual
 
 
-from scipy import signal, integrate
+from scipy import signal
 import matplotlib.pyplot as plt
 import numpy as np
+import json
 import os
+import utils.render_functions as render_f
+import utils.columnar_functions as col_f
+import utils.filter_functions as filt_f
+import utils.trace_functions as trace_f
+import utils.metadata_functions as meta_f
 g = 9.7838
 
+# Filtro aplicado ao sinal de força
+FILTER_TYPE             = 'butter'
+FILTER_CUTOFF_FREQUENCY = 30
+FILTER_ORDER            = 4
 
 
-def integrateSignal(signal, fs):
-    out = []
-    aux = 0
-    for i in range(0, len(signal) - 1):
-        sigInst = integrate.trapz(signal[i:i + 2]) / fs
-        aux = aux + sigInst
-        out.append(aux)
-
-    out.append(out[-1])
-    out = np.array(out)
-    return out
-
-def find(array_condition, start=0, end=-1, num=1, order='first', direction='foward'):
-    if direction == 'foward':
-        if end == -1:
-            end = len(array_condition)
-        values = []
-        arr_values = np.where(array_condition[start:end])[0]
-        if order == 'first':
-            values = arr_values[:num]
-        elif order == 'last':
-            values = arr_values[-num:len(arr_values)]
-        elif order == 'mean':
-            values.append(np.mean(arr_values))
-        if len(values) == 1:
-            return values[0] + start
-        else:
-            return np.array(values) + start
-    elif direction == 'backwards':
-        values = []
-        arr_values = np.where(array_condition[end:start])[0]
-        if order == 'first':
-            values = arr_values[-num:len(arr_values)]
-        elif order == 'last':
-            values = arr_values[:num]
-        elif order == 'mean':
-            values.append(np.mean(arr_values))
-        if len(values) == 1:
-            return values[0] + end
+
+# Integração trapezoidal acumulada ao longo de `axis` (vetorizada).
+# Aceita sinais 1-D ou pilhas 2-D de canais/ensaios. O resultado tem o mesmo
+# tamanho da entrada: a última amostra é repetida, como na versão original.
+def integrateSignal(signal, fs, axis=-1):
+    signal = np.moveaxis(np.asarray(signal, dtype=float), axis, -1)
+    out = np.empty(signal.shape)
+    np.cumsum(((signal[..., :-1] + signal[..., 1:]) / 2.0) / fs, axis=-1, out=out[..., :-1])
+    out[..., -1] = out[..., -2]
+    return np.moveaxis(out, -1, axis)
+
+
+# Integração trapezoidal acumulada em blocos, mantendo o estado entre blocos
+# (última amostra e valor acumulado). Permite integrar registros longos com
+# memória constante. A concatenação das saídas de update() seguida de
+# finalize() é idêntica a integrateSignal() aplicada ao sinal completo.
+class ChunkedIntegrator:
+
+    def __init__(self, fs, axis=-1):
+        self.fs = fs
+        self.axis = axis
+        self.last_sample = None
+        self.total = None
+
+    def update(self, block):
+        block = np.moveaxis(np.asarray(block, dtype=float), self.axis, -1)
+        if block.shape[-1] == 0:
+            return np.moveaxis(np.empty(block.shape), -1, self.axis)
+
+        if self.last_sample is None:
+            samples = block
+            self.total = np.zeros(block.shape[:-1])
         else:
-            return np.array(values) + end
-        
-
-def mass_input():
-    flag_float = False
-    while(not flag_float):
-        print("Não foi possível determinar a massa do voluntário pelo arquivo")
-        print("Por favor insira manualmente (Exemplo de formato:")
-        print("Massa [Kg]: 75.45")
-        try:
-            mass = float(input("Massa [Kg]: "))
-            if mass>0:
-                flag_float = True
-        except:
-            print("Não foi possível converter o valor para número decimal.")
-            print("Certifique-se que esteja usando apenas caractéres numéricos")
-            print("e ponto para separação de decimais")
-
-    return mass
-
-def readForceFile(file_path):
-
-    i=1
+            samples = np.concatenate((self.last_sample[..., np.newaxis], block), axis=-1)
+
+        # O acumulado anterior entra como primeiro termo da soma para que a
+        # ordem das somas seja a mesma da integração em um único passo
+        terms = np.empty(samples.shape)
+        terms[..., 0] = self.total
+        terms[..., 1:] = ((samples[..., :-1] + samples[..., 1:]) / 2.0) / self.fs
+        out = np.cumsum(terms, axis=-1)[..., 1:]
+
+        self.last_sample = block[..., -1].copy()
+        if out.shape[-1] > 0:
+            self.total = out[..., -1].copy()
+
+        return np.moveaxis(out, -1, self.axis)
+
+    # Repete a última amostra integrada, completando o tamanho do sinal
+    def finalize(self):
+        return np.moveaxis(np.asarray(self.total)[..., np.newaxis], -1, self.axis)
+
+
+# Integra uma sequência de blocos, produzindo a saída bloco a bloco
+def integrateSignalChunks(blocks, fs, axis=-1):
+    integrator = ChunkedIntegrator(fs, axis=axis)
+    for block in blocks:
+        yield integrator.update(block)
+    yield integrator.finalize()
+
+# Diretório e arquivos auxiliares (binário + metadados) de cache de um arquivo ACP
+ACP_CACHE_DIR = ".acp_cache"
+
+def acp_cache_paths(file_path):
+    cache_directory = os.path.join(os.path.dirname(os.path.abspath(file_path)), ACP_CACHE_DIR)
+    stem = os.path.basename(file_path)
+    return cache_directory, os.path.join(cache_directory, stem + ".npy"), os.path.join(cache_directory, stem + ".json")
+
+
+# Identifica o arquivo de origem pelo tempo de modificação e tamanho
+def acp_file_signature(file_path):
+    stat = os.stat(file_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+# Carrega o cache binário por memory-map, caso ainda corresponda ao arquivo ACP
+def load_acp_cache(file_path):
+    _, data_path, meta_path = acp_cache_paths(file_path)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get("source") != acp_file_signature(file_path):
+            return None
+        force_data_arr = np.load(data_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    return force_data_arr, meta
+
+
+def save_acp_cache(file_path, force_data_arr, meta):
+    cache_directory, data_path, meta_path = acp_cache_paths(file_path)
+    try:
+        os.makedirs(cache_directory, exist_ok=True)
+        np.save(data_path, force_data_arr)
+        # Metadados gravados por último: um cache incompleto nunca é considerado válido
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+    except OSError as e:
+        print("Não foi possível salvar o cache de {file_path}: {erro}".format(erro=e, file_path=file_path))
+
+
+# Lê o cabeçalho de um arquivo ACP aberto, até a linha com os nomes das colunas.
+# O arquivo fica posicionado no início do bloco numérico
+def readForceHeader(f):
+
     var_names = []
     mass = 0
     data_rate = 0
+    jump_type = None
+
+    first = True
+    for line_str in iter(f.readline, ''):
+        if first:
+            if (("Countermovement" in line_str) or ("CMJ" in line_str)):
+                jump_type = "CMJ"
+            elif (("Weighted" in line_str) or ("WSJ" in line_str)):
+                jump_type = "WSJ"
+            elif (("Squat" in line_str) or ("SJ" in line_str)):
+                jump_type = "SJ"
+            elif (("Isometric" in line_str) or ("ISO" in line_str)):
+                jump_type = "ISO"
+            first = False
+
+        # Parâmetros
+        # Massa ausente ou inválida permanece 0 e é resolvida em getDataFromACP
+        if "(body weight)" in line_str:
+            try:
+                mass = float(line_str.split(f'\t')[0])
+            except ValueError:
+                mass = 0
+
+        if "Time (s)" in line_str:
+            var_names = line_str.rstrip('\r\n').split(f'\t')
+            break
+
+        if "data rate" in line_str:
+            data_rate = extract_frequency(line_str)
+
+    return var_names, jump_type, mass, data_rate
+
+
+# Lê cabeçalho e bloco numérico em uma única passagem pelo arquivo
+def parseForceFile(file_path):
 
     with open(file_path, 'r') as f:
-        first = True
-        for line_str in f:
-            if first:
-                if (("Countermovement" in line_str) or ("CMJ" in line_str)):
-                    jump_type = "CMJ"
-                elif (("Weighted" in line_str) or ("WSJ" in line_str)):
-                    jump_type = "WSJ"
-                elif (("Squat" in line_str) or ("SJ" in line_str)):
-                    jump_type = "SJ"
-                elif (("Isometric" in line_str) or ("ISO" in line_str)):
-                    jump_type = "ISO"
-                first = False
-
-            # Parâmetros
-            if "(body weight)" in line_str:
-                try:
-                    mass = float(line_str.split(f'\t')[0])
-                    if mass==0:
-                        mass = mass_input()
-                except:
-                    mass = mass_input()
-            
-            if "Time (s)" in line_str:
-                var_names = line_str.split(f'\t')
-                break
-
-            if "data rate" in line_str:
-                data_rate = extract_frequency(line_str)
-
-            i+=1
-    force_data_arr = np.loadtxt(file_path, skiprows=i)
-    force_data_dic = {}
-    for key in var_names:
-        force_data_dic[key] = force_data_arr[:, var_names.index(key)]
-    
+        var_names, jump_type, mass, data_rate = readForceHeader(f)
+
+        # O restante do arquivo é o bloco numérico, lido a partir da posição atual.
+        # Armazenado em ordem de colunas para que cada coluna seja contígua
+        force_data_arr = np.asfortranarray(np.loadtxt(f, ndmin=2))
+
+    return force_data_arr, var_names, jump_type, mass, data_rate
+
+
+# Lê o arquivo ACP. Na primeira leitura grava um cache binário ao lado do arquivo
+# (.acp_cache/), usado por memory-map nas execuções seguintes enquanto o
+# arquivo não for modificado. As colunas do dicionário são views do array
+def readForceFile(file_path, use_cache=True):
+
+    cached = load_acp_cache(file_path) if use_cache else None
+
+    if cached is not None:
+        force_data_arr, meta = cached
+        var_names, jump_type = meta["var_names"], meta["jump_type"]
+        mass, data_rate = meta["mass"], meta["data_rate"]
+    else:
+        with trace_f.span("jumpy.parse", "jumpy"):
+            force_data_arr, var_names, jump_type, mass, data_rate = parseForceFile(file_path)
+        if use_cache:
+            meta = {
+                "source": acp_file_signature(file_path),
+                "var_names": var_names,
+                "jump_type": jump_type,
+                "mass": mass,
+                "data_rate": data_rate,
+            }
+            save_acp_cache(file_path, force_data_arr, meta)
+
+    force_data_dic = {key: force_data_arr[:, i] for i, key in enumerate(var_names)}
+
     return force_data_dic, var_names, jump_type, mass, data_rate
 
 
@@ -128,84 +215,158 @@ def getAcelVelDisp(force, fs, mass):
 
 
 
+# Massa e taxa ausentes no cabeçalho vêm do registro do voluntário ou são estimadas
+# a partir dos dados (ver metadata_functions). Ensaios sem valores válidos geram ValueError
 def getDataFromACP(file_path):
     fp_data, var_names, jump_type, mass, data_rate = readForceFile(file_path)
     force = fp_data['Raw Fz (N)']
     time = fp_data['Time (s)']
+    mass, data_rate = meta_f.resolve(file_path, mass, data_rate, time, force)
     fs = int(1/(time[1]-time[0]))
-    return force, time, fs,mass, data_rate
+    return force, time, fs,mass, data_rate, jump_type
 
-def filterForceSignal(time, force, fs, band_type, filter_type, cutoff_freq_Hz, N):
-    Wn = cutoff_freq_Hz / fs * 2
-    num, den = signal.iirfilter(N, cutoff_freq_Hz, btype=band_type, analog=False, ftype=filter_type, fs=fs, output='ba')
-    filtered_force = signal.filtfilt(num, den, force)
+# Filtragem de fase zero pelo banco de filtros (projeto SOS reaproveitado entre arquivos
+# com a mesma taxa). `force` pode ser uma pilha de canais, com o tempo ao longo de `axis`
+def filterForceSignal(time, force, fs, band_type, filter_type, cutoff_freq_Hz, N, axis=-1):
+    filtered_force = filt_f.zero_phase_filter(force, fs, cutoff_freq_Hz, N, filter_type=filter_type,
+                                              band_type=band_type, axis=axis)
     return filtered_force
 
 
 
 def runAnalysisCMJSJ(file_path):
     
-    force, time, fs,mass, data_rate = getDataFromACP(file_path)
+    with trace_f.span("jumpy.read", "jumpy"):
+        force, time, fs,mass, data_rate, jump_type = getDataFromACP(file_path)
     
-    force = filterForceSignal(time, force, fs, 'lowpass', 'butter', 30, 4)
+    with trace_f.span("jumpy.filter", "jumpy"):
+        force = filterForceSignal(time, force, fs, 'lowpass', FILTER_TYPE, FILTER_CUTOFF_FREQUENCY, FILTER_ORDER)
     
-    acc, vel, disp = getAcelVelDisp(force, fs, mass)
+    with trace_f.span("jumpy.integrate", "jumpy"):
+        acc, vel, disp = getAcelVelDisp(force, fs, mass)
 
 
 
-    return time, [disp, vel, acc], data_rate
+    return time, [disp, vel, acc], data_rate, jump_type
     
 ######################################################################################################
 
+# Limiar do voo: média + FLIGHT_THRESHOLD_SD desvios padrão da aceleração no meio do voo
+FLIGHT_THRESHOLD_SD = 5
 
+######################### Buscas em lote #########################
 
-def findPhases(cropped_time, disp, vel, acel):
+# Máscara (ensaios x amostras) das colunas em [start, end) de cada linha
+def index_mask(shape, start, end):
+    columns = np.arange(shape[1])
+    return (columns >= start[:, np.newaxis]) & (columns < end[:, np.newaxis])
 
-    # Find unweighting and braking phases
-    end_unweighting, end_braking = findUnweightingBraking(acel, vel, disp)
-    # Find propulsion and flight phases
-    end_propulsion, end_flight = findPropulsionFlight(acel, disp, cropped_time, end_braking)
 
-    # Organize data processed 
-    moments_dic = {
-            'init_movement_idx': 0, 'init_movement': cropped_time[0],
-            'end_unweighting_idx': end_unweighting, 'end_unweighting': cropped_time[end_unweighting],
-            'end_braking_idx': end_braking, 'end_braking': cropped_time[end_braking],
-            'end_propulsion_idx': end_propulsion, 'end_propulsion': cropped_time[end_propulsion],
+# argmin/argmax de cada linha em [start, end). Intervalos vazios resultam em -1
+def masked_argmin(values, start, end):
+    index = np.argmin(np.where(index_mask(values.shape, start, end), values, np.inf), axis=1)
+    return np.where(end > start, index, -1)
 
-            }
 
-    return moments_dic
+def masked_argmax(values, start, end):
+    index = np.argmax(np.where(index_mask(values.shape, start, end), values, -np.inf), axis=1)
+    return np.where(end > start, index, -1)
 
 
-def findUnweightingBraking(acel, vel, disp, flgCMJ = True):
-    if flgCMJ:
-        acel_min_idx = np.argmin(acel)
-        peak_vel_idx = np.argmax(vel[:acel_min_idx])
-        end_unweighting = np.argmin(vel[:peak_vel_idx])
-        end_braking = np.argmin(disp[:peak_vel_idx])
-    else:
-        end_unweighting = 0
-        end_braking = 0
-
-    return end_unweighting, end_braking
-
-def findPropulsionFlight(acel, disp, cropped_time, end_braking):
-    min_acel_idx = np.argmin(acel)
-    max_acel_idx = np.argmax(acel[min_acel_idx:]) + min_acel_idx
-    flight_center_idx = np.argmax(disp[:max_acel_idx])
-    flight_center_acel = acel[flight_center_idx]
-    aux_thres = flight_center_acel*0.9
-    aux1 = find(acel < aux_thres, start=end_braking, end=flight_center_idx, order='first')
-    aux2 = find(acel < aux_thres, start=max_acel_idx, end=flight_center_idx, order='first', direction='backwards')
-    aux_center = int((aux2 + aux1)/2)
-    num_samples = int(0.5*(aux2 - aux1))
-    samples_segment = acel[aux_center - int(num_samples/2): aux_center + int(num_samples/2)]
-    samples_time = cropped_time[aux_center - int(num_samples/2): aux_center + int(num_samples/2)]
-    flight_thres = np.mean(samples_segment) + np.std(samples_segment) * 5
-    end_propulsion = find(acel < flight_thres, start=aux1, end=flight_center_idx, order='first')
-    end_flight = find(acel < flight_thres, start=aux2, end=flight_center_idx, order='first', direction='backwards')
-    return end_propulsion, end_flight
+# Primeira/última amostra de cada linha em [start, end) que satisfaz a condição, ou -1
+def first_where(condition, start, end):
+    condition = condition & index_mask(condition.shape, start, end)
+    index = np.argmax(condition, axis=1)
+    return np.where(condition.any(axis=1), index, -1)
+
+
+def last_where(condition, start, end):
+    condition = condition & index_mask(condition.shape, start, end)
+    index = condition.shape[1] - 1 - np.argmax(condition[:, ::-1], axis=1)
+    return np.where(condition.any(axis=1), index, -1)
+
+
+# Média e desvio padrão de cada linha em [start, end)
+def masked_mean_std(values, start, end):
+    mask = index_mask(values.shape, start, end)
+    count = mask.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(mask, values, 0).sum(axis=1) / count
+        std = np.sqrt(np.where(mask, (values - mean[:, np.newaxis]) ** 2, 0).sum(axis=1) / count)
+    return mean, std
+
+
+# Valor de cada linha no índice indicado (NaN para índices inválidos)
+def take(values, index):
+    rows = np.arange(values.shape[0])
+    return np.where(index >= 0, values[rows, np.clip(index, 0, None)], np.nan)
+
+
+######################### Fases #########################
+
+# Fases do salto de todos os ensaios de uma vez (ensaios x amostras, completados com NaN),
+# sobre os sinais a partir de `start` (início do movimento). Em saltos sem contramovimento
+# (cmj falso), a descarga e a frenagem terminam no início do movimento.
+# Retorna os índices dos eventos (-1 quando um evento não é encontrado)
+def find_phases_batch(acel, vel, disp, start, lengths, cmj):
+
+    # Fases de descarga (unweighting) e frenagem (braking)
+    acel_min_idx = masked_argmin(acel, start, lengths)
+    peak_vel_idx = masked_argmax(vel, start, acel_min_idx)
+    end_unweighting = np.where(cmj, masked_argmin(vel, start, peak_vel_idx), start)
+    end_braking = np.where(cmj, masked_argmin(disp, start, peak_vel_idx), start)
+
+    # Fases de propulsão e voo
+    max_acel_idx = masked_argmax(acel, acel_min_idx, lengths)
+    flight_center_idx = masked_argmax(disp, start, max_acel_idx)
+    aux_thres = take(acel, flight_center_idx) * 0.9
+    below = acel < aux_thres[:, np.newaxis]
+    aux1 = first_where(below, end_braking, flight_center_idx)
+    aux2 = last_where(below, flight_center_idx, max_acel_idx)
+
+    aux_center = (aux2 + aux1) // 2
+    half_segment = ((aux2 - aux1) // 2) // 2
+    mean, std = masked_mean_std(acel, aux_center - half_segment, aux_center + half_segment)
+    flight_thres = mean + std * FLIGHT_THRESHOLD_SD
+    below = acel < flight_thres[:, np.newaxis]
+    end_propulsion = first_where(below, aux1, flight_center_idx)
+    end_flight = last_where(below, flight_center_idx, aux2)
+
+    phases = {
+        'init_movement':   start,
+        'end_unweighting': end_unweighting,
+        'end_braking':     end_braking,
+        'end_propulsion':  end_propulsion,
+        'end_flight':      end_flight,
+    }
+
+    # Um evento não encontrado invalida os eventos seguintes
+    valid = np.ones(len(start), dtype=bool)
+    for key in phases:
+        valid &= phases[key] >= 0
+        phases[key] = np.where(valid, phases[key], -1)
+
+    return phases
+
+
+# Fases de um único ensaio (sinais já recortados a partir do início do movimento),
+# pela mesma detecção em lote. Eventos não encontrados têm índice -1 e tempo NaN
+def findPhases(cropped_time, disp, vel, acel, flgCMJ=True):
+
+    acel = np.atleast_2d(np.asarray(acel, dtype=float))
+    phases = find_phases_batch(acel, np.atleast_2d(np.asarray(vel, dtype=float)),
+                               np.atleast_2d(np.asarray(disp, dtype=float)),
+                               np.zeros(1, dtype=int), np.array([acel.shape[1]]), np.array([flgCMJ]))
+
+    # Organize data processed
+    moments_dic = {}
+    for key, index in phases.items():
+        index = int(index[0])
+        moments_dic[key + '_idx'] = index
+        moments_dic[key] = cropped_time[index] if index >= 0 else np.nan
+
+    return moments_dic
+
 ######################################################################################################
 
 
@@ -219,39 +380,37 @@ import re
 def extract_frequency(string):
     # Extrai a frequência (inteiro) de uma string no formato:
     # "XXXX @ YYYY (number of samples, data rate)"
+    # Retorna 0 quando não há frequência; o valor é resolvido em getDataFromACP
 
     match = re.search(r'@ (\d+)', string)  # Busca um número após "@ "
     
     if match:
-        num = int(match.group(1))  # Retorna o número encontrado como inteiro
-    else:
-        flag_nofreq = True
-        while flag_nofreq:
-            user_input = input("Frequência não encontrada. Insira manualmente um valor inteiro: ")
-            if user_input.isdigit():
-                num =  int(user_input)
-                flag_nofreq = False
-            else:
-                print("Entrada inválida. Digite um número inteiro.")
-
-    return num
-
-def save_jp_data_to_file(time,fp_data,jp_output_directory,file_name):
+        return int(match.group(1))  # Retorna o número encontrado como inteiro
+    return 0
+
+JP_COLUMNS = ['time','displacement_y','velocity_y','acceleration_y']
+
+# Array (amostras x colunas) com tempo, deslocamento, velocidade e aceleração
+def jp_data_to_array(time,fp_data):
     disp, vel, acc = fp_data[0],fp_data[1],fp_data[2]
+    return np.column_stack((time,disp,vel,acc ))
+
 
-    combined_data = np.column_stack((time,disp,vel,acc ))
+# Grava os dados da plataforma de força no formato binário colunar (.npy + .json)
+# e, opcionalmente, em texto (file_name). Retorna os arquivos gravados
+def save_jp_data_to_file(time,fp_data,jp_output_directory,file_name,data_rate=None,export_csv=False):
+    combined_data = jp_data_to_array(time,fp_data)
+    columns = JP_COLUMNS
 
     file_path = os.path.join(jp_output_directory,file_name)
 
-    np.savetxt(
-        file_path,
-        combined_data,
-        delimiter=',',
-        fmt='%f',
-        header='time,displacement_y,velocity_y,acceleration_y',
-        comments=''
-    )
-    print(f"Dados salvos em {file_path}")
+    data_path = col_f.columnar_path(file_path)
+    saved_files = col_f.write_columns(data_path, combined_data, columns, data_rate, source="jumpy")
+    if export_csv:
+        saved_files += col_f.export_csv(file_path, combined_data, columns)
+
+    print(f"Dados salvos em {data_path}")
+    return saved_files
 
 
 def plot_com_data_to_file(com_data, filename='plot.png', x_label='Time', y_label='Y', title='COM Data Plot'):
@@ -270,21 +429,15 @@ def plot_com_data_to_file(com_data, filename='plot.png', x_label='Time', y_label
     print(f"Gráfico salvo como {filename}")
 
 def save_jp_figure(time,var,label,unit,file_name,output_directory,show = False):
-    plt.figure(figsize=(8, 6))  
-
-    plt.plot(time, var, linestyle='-', color='b', label='Sinal')
 
-    plt.title('{label} X Tempo'.format(label=label))
-    plt.xlabel('Tempo (s)')
-    plt.ylabel("{label} [{unit}]".format(label=label,unit=unit))
-    plt.grid()
-    plt.legend()
+    title  = '{label} X Tempo'.format(label=label)
+    ylabel = "{label} [{unit}]".format(label=label,unit=unit)
+    series_list = [render_f.series(time, var, linestyle='-', color='b', label='Sinal')]
 
     fig_name = "fig_"+label+"_"+file_name+".png"
 
     var_fig_path = os.path.join(output_directory,fig_name)
-    plt.savefig(var_fig_path, dpi=300)
+    render_f.line_plot(var_fig_path, series_list, title, 'Tempo (s)', ylabel, figsize=(8, 6), dpi=300)
 
     if show:
-        plt.show()
-    plt.close()
\ No newline at end of file
+        render_f.show_line_plot(series_list, title, 'Tempo (s)', ylabel, figsize=(8, 6))
@@ -12,22 +12,258 @@ import pandas as pd
 import scipy.interpolate as interpolate
 from scipy.spatial.transform import Rotation
 from scipy import signal
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import utils.filter_functions as filt_f
+import utils.trace_functions as trace_f
 
+# Zero-phase Butterworth filter along time (axis 0) of every column at once.
+# The design for each (order, cutoff, fs) is cached by the filter bank.
 def lowPassFilter(time, data, lowpass_cutoff_frequency, order=4):
     
-    fs = 1/np.round(np.mean(np.diff(time)),16)
-    wn = lowpass_cutoff_frequency/(fs/2)
-    sos = signal.butter(order/2, wn, btype='low', output='sos')
-    dataFilt = signal.sosfiltfilt(sos, data, axis=0)
+    fs = filt_f.sample_rate(time)
+    dataFilt = filt_f.zero_phase_filter(data, fs, lowpass_cutoff_frequency,
+                                        int(order/2), axis=0)
 
     return dataFilt
 
 
+# Parsed and initialized models, shared by every kinematics object of the
+# process that uses the same model file. Keyed by path and modification time,
+# least recently used models are evicted beyond MODEL_CACHE_SIZE.
+MODEL_CACHE_SIZE = 4
+_model_cache = OrderedDict()
+
+# Muscles of the force set, found and downcast once per model: handles, names,
+# force set indices and the dense muscle column of each name.
+def build_muscle_registry(forceSet):
+    
+    handles, names, forceIndices = [], [], []
+    for i in range(forceSet.getSize()):
+        c_force_elt = forceSet.get(i)
+        if 'Muscle' in c_force_elt.getConcreteClassName():
+            handles.append(opensim.Muscle.safeDownCast(c_force_elt))
+            names.append(c_force_elt.getName())
+            forceIndices.append(i)
+    
+    return {
+        'handles': handles,
+        'names': names,
+        'forceIndices': forceIndices,
+        'columns': dict((name, i) for i, name in enumerate(names)),
+        }
+
+def load_model(modelPath):
+    
+    model = opensim.Model(modelPath)
+    model.initSystem()
+    
+    stateVariableNames = model.getStateVariableNames()
+    
+    # Muscles.
+    forceSet = model.getForceSet()
+    muscleRegistry = build_muscle_registry(forceSet)
+    
+    # Coordinates.
+    coordinateSet = model.getCoordinateSet()
+    nCoordinates = coordinateSet.getSize()
+    coordinates = [coordinateSet.get(i).getName() 
+                   for i in range(nCoordinates)]
+    
+    return {
+        'model': model,
+        'stateVariableNames': [
+            stateVariableNames.get(i) for i in range(
+                stateVariableNames.getSize())],
+        'forceSet': forceSet,
+        'muscleRegistry': muscleRegistry,
+        'nMuscles': len(muscleRegistry['names']),
+        'coordinateSet': coordinateSet,
+        'nCoordinates': nCoordinates,
+        'coordinates': coordinates,
+        # Rotational and translational coordinates.
+        'translationalCoordinates': [
+            i for i in coordinates if 
+            coordinateSet.get(i).getMotionType() == 2],
+        'rotationalCoordinates': [
+            i for i in coordinates if 
+            coordinateSet.get(i).getMotionType() == 1],
+        }
+
+def get_cached_model(modelPath, cache_size=None):
+    
+    if cache_size is None:
+        cache_size = MODEL_CACHE_SIZE
+    
+    modelPath = os.path.abspath(modelPath)
+    key = (modelPath, os.path.getmtime(modelPath))
+    
+    if key in _model_cache:
+        _model_cache.move_to_end(key)
+        return _model_cache[key]
+    
+    # Drop versions of the same file that have since been modified.
+    for stale_key in [k for k in _model_cache if k[0] == modelPath]:
+        del _model_cache[stale_key]
+    
+    with trace_f.span("opencap.load_model", "opencap"):
+        model_entry = load_model(modelPath)
+    _model_cache[key] = model_entry
+    while len(_model_cache) > max(cache_size, 1):
+        _model_cache.popitem(last=False)
+    
+    return model_entry
+
+def clear_model_cache():
+    _model_cache.clear()
+
+
+# Differentiation methods for coordinate speeds and accelerations.
+DIFFERENTIATION_METHODS = ['spline', 'savgol', 'central']
+
+# Savitzky-Golay window (samples) and polynomial order.
+SAVGOL_WINDOW = 9
+SAVGOL_ORDER = 3
+
+def differentiate_coordinates(time, Qs, method='spline'):
+    
+    # Cubic (not-a-knot) interpolating spline of every column at once; same
+    # spline as InterpolatedUnivariateSpline(k=3).
+    if method == 'spline':
+        spline = interpolate.make_interp_spline(time, Qs, k=3, axis=0)
+        Qds = spline.derivative(nu=1)(time)
+        Qdds = spline.derivative(nu=2)(time)
+    
+    # Savitzky-Golay derivatives (uniform sampling).
+    elif method == 'savgol':
+        dt = np.mean(np.diff(time))
+        window = min(SAVGOL_WINDOW, Qs.shape[0] - (1 - Qs.shape[0] % 2))
+        Qds = signal.savgol_filter(Qs, window, SAVGOL_ORDER, deriv=1, 
+                                   delta=dt, axis=0)
+        Qdds = signal.savgol_filter(Qs, window, SAVGOL_ORDER, deriv=2, 
+                                    delta=dt, axis=0)
+    
+    # Second-order central differences.
+    elif method == 'central':
+        Qds = np.gradient(Qs, time, axis=0)
+        Qdds = np.gradient(Qds, time, axis=0)
+    
+    else:
+        raise Exception(method + ' is not a valid differentiation method.')
+    
+    return Qds, Qdds
+
+# Time-series table built from a numpy matrix in a single call.
+def build_table(time, data, labels):
+    
+    table = opensim.TimeSeriesTable(
+        opensim.StdVectorDouble(list(time)),
+        opensim.Matrix.createFromMat(np.ascontiguousarray(data)),
+        opensim.StdVectorString(labels))
+    table.addTableMetaDataString('inDegrees', 'no')
+    
+    return table
+
+
+def number_of_states(states):
+    return len(states) if hasattr(states, '__len__') else states.getSize()
+
+# Moment arms of the (muscle column, coordinate index) pairs for every state.
+# Pairs not listed stay at zero.
+def evaluate_moment_arms(modelEntry, states, pairs):
+    
+    model = modelEntry['model']
+    muscles = modelEntry['muscleRegistry']['handles']
+    coordinateSet = modelEntry['coordinateSet']
+    coordinates = dict(
+        (c, coordinateSet.get(c)) for c in set(pair[1] for pair in pairs))
+    
+    dM = np.zeros((number_of_states(states), modelEntry['nMuscles'], 
+                   modelEntry['nCoordinates']))
+    for i in range(dM.shape[0]):
+        state = states[i]
+        model.realizePosition(state)
+        for m, c in pairs:
+            dM[i, m, c] = muscles[m].computeMomentArm(state, coordinates[c])
+            
+    return dM
+
+# Muscle-tendon lengths of every muscle for every state.
+def evaluate_muscle_tendon_lengths(modelEntry, states):
+    
+    model = modelEntry['model']
+    muscles = modelEntry['muscleRegistry']['handles']
+    
+    lMT = np.zeros((number_of_states(states), len(muscles)))
+    for i in range(lMT.shape[0]):
+        state = states[i]
+        model.realizePosition(state)
+        for m, muscle in enumerate(muscles):
+            lMT[i, m] = muscle.getLength(state)
+            
+    return lMT
+
+# A single reusable State that is rewritten for every frame of a table of
+# coordinate values and speeds. Indexing sets the values of frame i (state
+# variables missing from the table, eg muscle states, are zero) and returns
+# the same State, so only one State exists regardless of the number of frames.
+# Callers realize the stage they need before evaluating the frame.
+class FrameStates:
+    
+    def __init__(self, modelEntry, time, data, labels):
+        
+        self.model = modelEntry['model']
+        self.time = np.asarray(time)
+        self.data = np.asarray(data)
+        
+        # Map the state variables of the model to the columns of the data.
+        columns = dict((label, i) for i, label in enumerate(labels))
+        stateVariableNames = modelEntry['stateVariableNames']
+        self.stateIndices = [i for i, name in enumerate(stateVariableNames) 
+                             if name in columns]
+        self.dataColumns = [columns[stateVariableNames[i]] 
+                            for i in self.stateIndices]
+        self.values = np.zeros(len(stateVariableNames))
+        
+        self.state = opensim.State(self.model.getWorkingState())
+        
+    def __len__(self):
+        return self.data.shape[0]
+    
+    def __getitem__(self, i):
+        
+        self.values[self.stateIndices] = self.data[i, self.dataColumns]
+        self.state.setTime(float(self.time[i]))
+        self.model.setStateVariableValues(
+            self.state, opensim.Vector.createFromMat(self.values))
+        
+        return self.state
+
+# Frame evaluation modes: a single reusable State (frames) or a full
+# StatesTrajectory built from a table padded with the missing states.
+EVALUATION_MODES = ['frames', 'trajectory']
+
+# Worker process: evaluates a chunk of frames on its own copy of the model
+# with one of the evaluators above.
+def frame_chunk_worker(evaluator, modelPath, time, data, labels, *args):
+    
+    opensim.Logger.setLevelString('error')
+    modelEntry = get_cached_model(modelPath)
+    states = FrameStates(modelEntry, time, data, labels)
+    
+    return evaluator(modelEntry, states, *args)
+
+
 class kinematics:  
     
     def __init__(self, dir_path, trialName, 
                  modelName,
-                 lowpass_cutoff_frequency_for_coordinate_values=-1):
+                 lowpass_cutoff_frequency_for_coordinate_values=-1,
+                 differentiation='spline', evaluation='frames'):
+        
+        if not evaluation in EVALUATION_MODES:
+            raise Exception(evaluation + ' is not a valid evaluation mode.')
+        self.evaluation = evaluation
         
         self.lowpass_cutoff_frequency_for_coordinate_values = (
             lowpass_cutoff_frequency_for_coordinate_values)
@@ -44,8 +280,9 @@ class kinematics:
         if not os.path.exists(modelPath):
             raise Exception('Model path: ' + modelPath + ' does not exist.')
 
-        self.model = opensim.Model(modelPath)
-        self.model.initSystem()
+        self.modelPath = modelPath
+        modelEntry = get_cached_model(modelPath)
+        self.model = modelEntry['model']
         
         # Motion file with coordinate values.
         motionPath = os.path.join(dir_path, 'OpenSimData', 'Kinematics',
@@ -78,59 +315,46 @@ class kinematics:
                 time_temp[self.table.getNearestRowIndexForTime(self.time[0])],
                 time_temp[self.table.getNearestRowIndexForTime(self.time[-1])])
                 
-        # Compute coordinate speeds and accelerations and add speeds to table.        
+        # Compute coordinate speeds and accelerations of all coordinates at once.
         self.Qs = self.table.getMatrix().to_numpy()
-        self.Qds = np.zeros(self.Qs.shape)
-        self.Qdds = np.zeros(self.Qs.shape)
+        self.Qds, self.Qdds = differentiate_coordinates(
+            self.time, self.Qs, method=differentiation)
         columnAbsoluteLabels = list(self.table.getColumnLabels())
-        for i, columnLabel in enumerate(columnAbsoluteLabels):
-            spline = interpolate.InterpolatedUnivariateSpline(
-                self.time, self.Qs[:,i], k=3)
-            # Coordinate speeds
-            splineD1 = spline.derivative(n=1)
-            self.Qds[:,i] = splineD1(self.time)
-            # Coordinate accelerations.
-            splineD2 = spline.derivative(n=2)
-            self.Qdds[:,i] = splineD2(self.time)            
-            # Add coordinate speeds to table.
-            columnLabel_speed = columnLabel[:-5] + 'speed'
-            self.table.appendColumn(
-                columnLabel_speed, 
-                opensim.Vector(self.Qds[:,i].flatten().tolist()))
+        speedLabels = [columnLabel[:-5] + 'speed' 
+                       for columnLabel in columnAbsoluteLabels]
             
-        # Append missing muscle states to table.
-        # Needed for StatesTrajectory.
-        stateVariableNames = self.model.getStateVariableNames()
-        stateVariableNamesStr = [
-            stateVariableNames.get(i) for i in range(
-                stateVariableNames.getSize())]
-        existingLabels = self.table.getColumnLabels()
-        for stateVariableNameStr in stateVariableNamesStr:
-            if not stateVariableNameStr in existingLabels:
-                vec_0 = opensim.Vector([0] * self.table.getNumRows())            
-                self.table.appendColumn(stateVariableNameStr, vec_0)
+        # State variables that are not in the table (eg muscle states). They
+        # are only needed to build a StatesTrajectory.
+        existingLabels = set(columnAbsoluteLabels + speedLabels)
+        self.missingStateLabels = [
+            stateVariableNameStr for stateVariableNameStr in 
+            modelEntry['stateVariableNames'] if 
+            not stateVariableNameStr in existingLabels]
+        
+        # Build the table with coordinate values and speeds in bulk.
+        self.table = build_table(
+            self.table.getIndependentColumn(), 
+            np.concatenate((self.Qs, self.Qds), axis=1),
+            columnAbsoluteLabels + speedLabels)
                        
-        # Number of muscles.
-        self.nMuscles = 0
-        self.forceSet = self.model.getForceSet()
-        for i in range(self.forceSet.getSize()):        
-            c_force_elt = self.forceSet.get(i)  
-            if 'Muscle' in c_force_elt.getConcreteClassName():
-                self.nMuscles += 1
+        # Muscles.
+        self.modelEntry = modelEntry
+        self.muscleRegistry = modelEntry['muscleRegistry']
+        self.nMuscles = modelEntry['nMuscles']
+        self.forceSet = modelEntry['forceSet']
                 
         # Coordinates.
-        self.coordinateSet = self.model.getCoordinateSet()
-        self.nCoordinates = self.coordinateSet.getSize()
-        self.coordinates = [self.coordinateSet.get(i).getName() 
-                            for i in range(self.nCoordinates)]
+        self.coordinateSet = modelEntry['coordinateSet']
+        self.nCoordinates = modelEntry['nCoordinates']
+        self.coordinates = list(modelEntry['coordinates'])
             
         # Find rotational and translational coordinates.
         self.idxColumnTrLabels = [
-            self.columnLabels.index(i) for i in self.coordinates if \
-            self.coordinateSet.get(i).getMotionType() == 2]
+            self.columnLabels.index(i) for i in 
+            modelEntry['translationalCoordinates']]
         self.idxColumnRotLabels = [
-            self.columnLabels.index(i) for i in self.coordinates if \
-            self.coordinateSet.get(i).getMotionType() == 1]
+            self.columnLabels.index(i) for i in 
+            modelEntry['rotationalCoordinates']]
         
         # TODO: hard coded
         self.rootCoordinates = [
@@ -145,12 +369,50 @@ class kinematics:
                                'arm_flex_l', 'arm_add_l', 'arm_rot_l', 
                                'elbow_flex_l', 'pro_sup_l']
     
-    # Only set the state trajectory when needed because it is slow.
+    # Replacing the table invalidates everything derived from it (frame
+    # states, state trajectory and center of mass).
+    @property
+    def table(self):
+        return self._table
+
+    @table.setter
+    def table(self, table):
+        self._table = table
+        self._frameStates = None
+        self._stateTrajectory = None
+        self._com_values = None
+        self._com_speeds = None
+
+    # States of the frames of the table, according to the evaluation mode.
+    def states(self):
+        if self.evaluation == 'trajectory':
+            return self.stateTrajectory()
+        if self._frameStates is None:
+            self._frameStates = FrameStates(
+                self.modelEntry, self.table.getIndependentColumn(),
+                self.table.getMatrix().to_numpy(), 
+                list(self.table.getColumnLabels()))
+        return self._frameStates
+
+    # Only set the state trajectory when needed because it is slow. The
+    # missing states are padded with zeros in a copy of the table.
     def stateTrajectory(self):
         if self._stateTrajectory is None:
-            self._stateTrajectory = (
-                opensim.StatesTrajectory.createFromStatesTable(
-                    self.model, self.table))
+            labels = list(self.table.getColumnLabels())
+            missingLabels = [label for label in self.missingStateLabels 
+                             if not label in labels]
+            table = self.table
+            if missingLabels:
+                data = self.table.getMatrix().to_numpy()
+                table = build_table(
+                    self.table.getIndependentColumn(),
+                    np.concatenate((data, np.zeros(
+                        (data.shape[0], len(missingLabels)))), axis=1),
+                    labels + missingLabels)
+            with trace_f.span("opencap.state_trajectory", "opencap"):
+                self._stateTrajectory = (
+                    opensim.StatesTrajectory.createFromStatesTable(
+                        self.model, table))
         return self._stateTrajectory
     
         
@@ -248,21 +510,18 @@ class kinematics:
         
         return coordinate_accelerations
     
-    def get_muscle_tendon_lengths(self, lowpass_cutoff_frequency=-1):
+    def get_muscle_tendon_lengths(self, lowpass_cutoff_frequency=-1, 
+                                  n_workers=1, chunk_size=None):
+        
+        muscleNames = self.muscleRegistry['names']
         
         # Compute muscle-tendon lengths.
-        lMT = np.zeros((self.table.getNumRows(), self.nMuscles))
-        for i in range(self.table.getNumRows()):
-            self.model.realizePosition(self.stateTrajectory()[i])
-            if i == 0:
-                muscleNames = [] 
-            for m in range(self.forceSet.getSize()):        
-                c_force_elt = self.forceSet.get(m)  
-                if 'Muscle' in c_force_elt.getConcreteClassName():
-                    cObj = opensim.Muscle.safeDownCast(c_force_elt)            
-                    lMT[i,m] = cObj.getLength(self.stateTrajectory()[i])
-                    if i == 0:
-                        muscleNames.append(c_force_elt.getName())
+        if n_workers > 1:
+            lMT = self.map_frame_chunks(evaluate_muscle_tendon_lengths, (), 
+                                        n_workers, chunk_size)
+        else:
+            lMT = evaluate_muscle_tendon_lengths(self.modelEntry, 
+                                                 self.states())
                         
         # Filter.
         if lowpass_cutoff_frequency > 0:
@@ -276,49 +535,70 @@ class kinematics:
         
         return muscle_tendon_lengths
     
-    def get_moment_arms(self, lowpass_cutoff_frequency=-1):
-        
-        # Compute moment arms.
-        dM =  np.zeros((self.table.getNumRows(), self.nMuscles, 
-                        self.nCoordinates))
-        for i in range(self.table.getNumRows()):            
-            self.model.realizePosition(self.stateTrajectory()[i])
-            if i == 0:
-                muscleNames = []
-            for m in range(self.forceSet.getSize()):        
-                c_force_elt = self.forceSet.get(m)  
-                if 'Muscle' in c_force_elt.getConcreteClassName():
-                    muscleName = c_force_elt.getName()
-                    cObj = opensim.Muscle.safeDownCast(c_force_elt)
-                    if i == 0:
-                        muscleNames.append(c_force_elt.getName())                    
-                    for c, coord in enumerate(self.coordinates):
-                        # We use prior knowledge to improve computation speed;
-                        # We do not want to compute moment arms that are not
-                        # relevant, eg for a muscle of the left side with 
-                        # respect to a coordinate of the right side.
-                        if muscleName[-2:] == '_l' and coord[-2:] == '_r':
-                            dM[i, m, c] = 0
-                        elif muscleName[-2:] == '_r' and coord[-2:] == '_l':
-                            dM[i, m, c] = 0
-                        elif (coord in self.rootCoordinates or 
-                              coord in self.lumbarCoordinates or 
-                              coord in self.armCoordinates):
-                            dM[i, m, c] = 0
-                        else:
-                            coordinate = self.coordinateSet.get(
-                                self.coordinates.index(coord))
-                            dM[i, m, c] = cObj.computeMomentArm(
-                                self.stateTrajectory()[i], coordinate)
+    # Relevant (muscle column, coordinate index) pairs.
+    # We use prior knowledge to improve computation speed; we do not want to
+    # compute moment arms that are not relevant, eg for a muscle of the left
+    # side with respect to a coordinate of the right side, or with respect to
+    # root, lumbar and arm coordinates. Computed once, not for every frame.
+    def get_moment_arm_pairs(self):
+        
+        excludedCoordinates = set(self.rootCoordinates + 
+                                  self.lumbarCoordinates + 
+                                  self.armCoordinates)
+        pairs = []
+        for m, muscleName in enumerate(self.muscleRegistry['names']):
+            for c, coord in enumerate(self.coordinates):
+                if muscleName[-2:] == '_l' and coord[-2:] == '_r':
+                    continue
+                elif muscleName[-2:] == '_r' and coord[-2:] == '_l':
+                    continue
+                elif coord in excludedCoordinates:
+                    continue
+                pairs.append((m, c))
+                
+        return pairs
+    
+    # Split the frames in chunks and evaluate them in worker processes, each
+    # with its own copy of the model. Returns the concatenated chunk results.
+    def map_frame_chunks(self, evaluator, args, n_workers, chunk_size=None):
+        
+        nFrames = self.table.getNumRows()
+        if chunk_size is None:
+            chunk_size = int(np.ceil(nFrames / n_workers))
+        chunks = [(i, min(i + chunk_size, nFrames)) 
+                  for i in range(0, nFrames, max(chunk_size, 1))]
+        
+        time = np.asarray(self.table.getIndependentColumn())
+        data = self.table.getMatrix().to_numpy()
+        labels = list(self.table.getColumnLabels())
+        
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(
+                frame_chunk_worker, evaluator, self.modelPath, time[i0:i1], 
+                data[i0:i1], labels, *args) for i0, i1 in chunks]
+            results = [future.result() for future in futures]
+            
+        return np.concatenate(results, axis=0)
+    
+    def get_moment_arms(self, lowpass_cutoff_frequency=-1, n_workers=1,
+                        chunk_size=None):
+        
+        muscleNames = self.muscleRegistry['names']
+        pairs = self.get_moment_arm_pairs()
+        
+        # Compute moment arms, only for the relevant pairs.
+        if n_workers > 1:
+            dM = self.map_frame_chunks(evaluate_moment_arms, (pairs,), 
+                                       n_workers, chunk_size)
+        else:
+            dM = evaluate_moment_arms(self.modelEntry, self.states(), pairs)
                             
         # Clean numerical artefacts (ie, moment arms smaller than 1e-5 m).
         dM[np.abs(dM) < 1e-5] = 0
         
         # Filter.
         if lowpass_cutoff_frequency > 0:            
-            for c, coord in enumerate(self.coordinates):
-                dM[:, :, c] = lowPassFilter(self.time, dM[:, :, c], 
-                                            lowpass_cutoff_frequency)
+            dM = lowPassFilter(self.time, dM, lowpass_cutoff_frequency)
         
         # Return as DataFrame.
         moment_arms = {}
@@ -330,21 +610,40 @@ class kinematics:
             
         return moment_arms
     
+    # Center of mass position and velocity are memoized: the sweep over the
+    # state trajectory only runs once per table.
+    @property
+    def com_values(self):
+        self.compute_center_of_mass()
+        return self._com_values
+
+    @property
+    def com_speeds(self):
+        self.compute_center_of_mass()
+        return self._com_speeds
+
     def compute_center_of_mass(self):        
         
+        if self._com_values is not None:
+            return
+        
         # Compute center of mass position and velocity.
-        self.com_values = np.zeros((self.table.getNumRows(),3))
-        self.com_speeds = np.zeros((self.table.getNumRows(),3))        
-        for i in range(self.table.getNumRows()):            
-            self.model.realizeVelocity(self.stateTrajectory()[i])
-            self.com_values[i,:] = self.model.calcMassCenterPosition(
-                self.stateTrajectory()[i]).to_numpy()
-            self.com_speeds[i,:] = self.model.calcMassCenterVelocity(
-                self.stateTrajectory()[i]).to_numpy()
+        com_values = np.zeros((self.table.getNumRows(),3))
+        com_speeds = np.zeros((self.table.getNumRows(),3))        
+        states = self.states()
+        with trace_f.span("opencap.com_sweep", "opencap"):
+            for i in range(self.table.getNumRows()):            
+                state = states[i]
+                self.model.realizeVelocity(state)
+                com_values[i,:] = self.model.calcMassCenterPosition(
+                    state).to_numpy()
+                com_speeds[i,:] = self.model.calcMassCenterVelocity(
+                    state).to_numpy()
+        self._com_values = com_values
+        self._com_speeds = com_speeds
             
     def get_center_of_mass_values(self, lowpass_cutoff_frequency=-1):
         
-        self.compute_center_of_mass()        
         com_v = self.com_values
         
         # Filter.
@@ -361,7 +660,6 @@ class kinematics:
     
     def get_center_of_mass_speeds(self, lowpass_cutoff_frequency=-1):
         
-        self.compute_center_of_mass()        
         com_s = self.com_speeds
         
         # Filter.
@@ -378,7 +676,6 @@ class kinematics:
     
     def get_center_of_mass_accelerations(self, lowpass_cutoff_frequency=-1):
         
-        self.compute_center_of_mass()        
         com_s = self.com_speeds
         
         # Accelerations are first time derivative of speeds.
@@ -400,6 +697,19 @@ class kinematics:
         com_accelerations = pd.DataFrame(data=data, columns=columns)
         
         return com_accelerations 
+    
+    # Position, velocity and acceleration of the center of mass from a single
+    # sweep over the state trajectory.
+    def get_center_of_mass_kinematics(self, lowpass_cutoff_frequency=-1):
+        
+        com_values = self.get_center_of_mass_values(
+            lowpass_cutoff_frequency=lowpass_cutoff_frequency)
+        com_speeds = self.get_center_of_mass_speeds(
+            lowpass_cutoff_frequency=lowpass_cutoff_frequency)
+        com_accelerations = self.get_center_of_mass_accelerations(
+            lowpass_cutoff_frequency=lowpass_cutoff_frequency)
+        
+        return com_values, com_speeds, com_accelerations
 
     def get_body_angular_velocity(self, body_names=None, lowpass_cutoff_frequency=-1,
                                   expressed_in='body'):
@@ -418,8 +728,9 @@ class kinematics:
         angular_velocity = np.ndarray((self.table.getNumRows(),
                               len(body_names)*3)) # time x bodies x dim
                         
+        states = self.states()
         for i_time in range(self.table.getNumRows()): # loop over time
-            state = self.stateTrajectory()[i_time]
+            state = states[i_time]
             self.model.realizeVelocity(state)
             
             
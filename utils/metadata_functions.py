@@ -0,0 +1,133 @@
+# Arquivo: metadata_functions.py
+#
+# :: Metadados dos ensaios (massa do voluntário e taxa de amostragem) sem interação
+# :: Quando o cabeçalho do arquivo ACP não informa um valor, ele é procurado no
+# :: registro do voluntário (metadata.csv) e, por fim, estimado a partir dos dados:
+# :: a massa pelo peso na janela parada inicial e a taxa pela coluna de tempo.
+# :: Ensaios sem valores válidos resultam em erro (ValueError), registrado como
+# :: falha da execução, sem aguardar entrada do usuário
+# ::
+# :: Registro (data/voluntario/metadata.csv ou no próprio diretório dos arquivos ACP):
+# ::     file,mass,data_rate
+# ::     *,75.4,
+# ::     jumpy_salto_3.acp,,1000
+# :: A linha "*" vale para todos os ensaios do voluntário; células vazias são ignoradas
+
+import os
+import csv
+import numpy as np
+from functools import lru_cache
+import utils.filter_functions as filt_f
+
+
+METADATA_FILE = "metadata.csv"
+METADATA_ALL  = "*"
+
+# Janela parada no início do registro usada para estimar a massa (s)
+MASS_QUIET_TIME = 0.5
+# Variação máxima (desvio padrão / média) da força na janela parada
+MASS_QUIET_MAX_CV = 0.1
+
+# Mesmo valor de jumpy_functions (que importa este módulo)
+g = 9.7838
+
+
+######################### Registro #########################
+
+# Arquivos de registro que podem se aplicar a um arquivo ACP, do mais específico
+# (diretório do arquivo) ao mais geral (diretório do voluntário)
+def registry_files(file_path):
+    directory = os.path.dirname(os.path.abspath(file_path))
+    return [os.path.join(d, METADATA_FILE) for d in (directory, os.path.dirname(directory))]
+
+
+def existing_registry_files(file_path):
+    return [f for f in registry_files(file_path) if os.path.exists(f)]
+
+
+def parse_value(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        value = float(value)
+    except ValueError:
+        return None
+    return value if np.isfinite(value) and value > 0 else None
+
+
+# Registro lido uma vez por versão do arquivo (caminho e tempo de modificação)
+@lru_cache(maxsize=32)
+def read_registry(registry_path, mtime_ns):
+    registry = {}
+    with open(registry_path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            name = (row.get("file") or "").strip()
+            if name:
+                registry[name] = {"mass": parse_value(row.get("mass")),
+                                  "data_rate": parse_value(row.get("data_rate"))}
+    return registry
+
+
+def load_registry(registry_path):
+    try:
+        return read_registry(registry_path, os.stat(registry_path).st_mtime_ns)
+    except (OSError, csv.Error) as e:
+        print("Não foi possível ler o registro {path}: {erro}".format(erro=e, path=registry_path))
+        return {}
+
+
+# Valor de `key` para o arquivo ACP no registro: a linha do próprio arquivo tem
+# prioridade sobre a linha "*", e o registro do diretório do arquivo sobre o do voluntário
+def lookup(file_path, key):
+    name = os.path.basename(file_path)
+    for registry_path in existing_registry_files(file_path):
+        registry = load_registry(registry_path)
+        for row_name in (name, METADATA_ALL):
+            value = registry.get(row_name, {}).get(key)
+            if value is not None:
+                return value
+    return None
+
+
+######################### Estimativas #########################
+
+# Massa pelo peso médio na janela parada inicial. Retorna None quando a janela
+# não é estável o suficiente (voluntário fora da plataforma ou em movimento)
+def estimate_mass(force, fs):
+    n = int(MASS_QUIET_TIME * fs)
+    if n < 2 or len(force) < n:
+        return None
+    quiet = np.asarray(force[:n], dtype=float)
+    mean = float(np.mean(quiet))
+    if not np.isfinite(mean) or mean <= 0 or np.std(quiet) > MASS_QUIET_MAX_CV * mean:
+        return None
+    return mean / g
+
+
+# Taxa de amostragem pela coluna de tempo (crescente e com ao menos duas amostras)
+def estimate_sample_rate(time):
+    time = np.asarray(time, dtype=float)
+    if len(time) < 2 or not np.all(np.diff(time) > 0):
+        return None
+    return float(filt_f.sample_rate(time))
+
+
+######################### Resolução #########################
+
+# Massa e taxa de amostragem de um ensaio: cabeçalho, registro e, por fim, estimativa
+def resolve(file_path, mass, data_rate, time, force):
+    if not data_rate:
+        data_rate = lookup(file_path, "data_rate") or estimate_sample_rate(time)
+    if not data_rate:
+        raise ValueError("Taxa de amostragem não encontrada no cabeçalho, no registro "
+                         "ou na coluna de tempo: {file_path}".format(file_path=file_path))
+
+    if not mass:
+        mass = lookup(file_path, "mass") or estimate_mass(force, data_rate)
+    if not mass:
+        raise ValueError("Massa não encontrada no cabeçalho nem no registro ({registry}) e a janela "
+                         "parada inicial não permite estimá-la: {file_path}".format(
+                             registry=METADATA_FILE, file_path=file_path))
+
+    return mass, data_rate
@@ -5,9 +5,11 @@
 import opensim as osim
 import os
 import numpy as np
-import matplotlib.pyplot as plt
 
 from utils.kinematic_class import kinematics
+import utils.render_functions as render_f
+import utils.columnar_functions as col_f
+import utils.trace_functions as trace_f
 
 
 
@@ -17,63 +19,63 @@ ACC = 2
 MODEL = "LaiUhlrich2022_scaled"
 
 
-def com_analisys(directory_path,mot_file_name,cutoff_frequency = 10):
-    kinematic = kinematics(directory_path,mot_file_name,MODEL,lowpass_cutoff_frequency_for_coordinate_values=cutoff_frequency)
-    oc_pos = kinematic.get_center_of_mass_values(lowpass_cutoff_frequency=cutoff_frequency)
-    oc_vel = kinematic.get_center_of_mass_speeds(lowpass_cutoff_frequency=cutoff_frequency)
-    oc_acc = kinematic.get_center_of_mass_accelerations(lowpass_cutoff_frequency=cutoff_frequency)
+def com_analisys(directory_path,mot_file_name,cutoff_frequency = 10,differentiation = 'spline'):
+    with trace_f.span("opencap.kinematics", "opencap"):
+        kinematic = kinematics(directory_path,mot_file_name,MODEL,lowpass_cutoff_frequency_for_coordinate_values=cutoff_frequency,
+                               differentiation=differentiation)
+    with trace_f.span("opencap.com_kinematics", "opencap"):
+        oc_pos, oc_vel, oc_acc = kinematic.get_center_of_mass_kinematics(lowpass_cutoff_frequency=cutoff_frequency)
     return [oc_pos,oc_vel,oc_acc]
 
 
 ######################### File functions #########################
 
-def save_com_data_to_file(com_data,com_output_directory, file_name):
-    pos = 0
-    vel = 1
-    acc = 2
+COM_COLUMNS = ['time','position_y','velocity_y','acceleration_y']
+
+# Array (amostras x colunas) com tempo e componente vertical de posição, velocidade e aceleração
+def com_data_to_array(com_data):
+    return np.column_stack((
+        com_data[POS]["time"].to_numpy(),
+        com_data[POS]["y"].to_numpy(),  
+        com_data[VEL]["y"].to_numpy(),  
+        com_data[ACC]["y"].to_numpy(),  
+    ))
+
+
+# Grava os dados de centro de massa no formato binário colunar (.npy + .json)
+# e, opcionalmente, em texto (file_name). Retorna os arquivos gravados
+def save_com_data_to_file(com_data,com_output_directory, file_name, export_csv=False):
 
     file_path = os.path.join(com_output_directory,file_name)
 
 
-    time = com_data[0]["time"].to_numpy()
+    combined_data = com_data_to_array(com_data)
+    time = combined_data[:,0]
+    columns = COM_COLUMNS
+    sample_rate = 1/np.mean(np.diff(time)) if len(time) > 1 else None
 
-    combined_data = np.column_stack((
-        time,
-        com_data[pos]["y"].to_numpy(),  
-        com_data[vel]["y"].to_numpy(),  
-        com_data[acc]["y"].to_numpy(),  
-    ))
-    np.savetxt(
-        file_path,
-        combined_data,
-        delimiter=',',
-        fmt='%f',
-        header='time,position_y,velocity_y,acceleration_y',
-        comments=''
-    )
-    print(f"Dados salvos em {file_path}")
+    data_path = col_f.columnar_path(file_path)
+    saved_files = col_f.write_columns(data_path, combined_data, columns, sample_rate, source="opencap")
+    if export_csv:
+        saved_files += col_f.export_csv(file_path, combined_data, columns)
 
+    print(f"Dados salvos em {data_path}")
+    return saved_files
 
 
 
 
-def save_oc_figure(var,label,unit,file_name,output_directory,show = False):
-    plt.figure(figsize=(8, 6))  
 
-    plt.plot(var['time'], var['y'], linestyle='-', color='b', label='Sinal')
+def save_oc_figure(var,label,unit,file_name,output_directory,show = False):
 
-    plt.title('{label} X Tempo'.format(label=label))
-    plt.xlabel('Tempo (s)')
-    plt.ylabel("{label} [{unit}]".format(label=label,unit=unit))
-    plt.grid()
-    plt.legend()
+    title  = '{label} X Tempo'.format(label=label)
+    ylabel = "{label} [{unit}]".format(label=label,unit=unit)
+    series_list = [render_f.series(var['time'], var['y'], linestyle='-', color='b', label='Sinal')]
 
     fig_name = "fig_"+label+"_"+file_name+".png"
 
     var_fig_path = os.path.join(output_directory,fig_name)
-    plt.savefig(var_fig_path, dpi=300)
+    render_f.line_plot(var_fig_path, series_list, title, 'Tempo (s)', ylabel, figsize=(8, 6), dpi=300)
 
     if show:
-        plt.show
-    plt.close()
-
+        render_f.show_line_plot(series_list, title, 'Tempo (s)', ylabel, figsize=(8, 6))
@@ -7,7 +7,12 @@ import matplotlib.pyplot as plt
 import opensim as osim
 import os
 from resampy import resample 
-from scipy.signal import correlate
+from scipy.signal import resample_poly, firwin
+from functools import lru_cache
+from scipy.fft import next_fast_len
+from fractions import Fraction
+import utils.render_functions as render_f
+import utils.columnar_functions as col_f
 
 def format_numpy_array (data, column_name,time=False):
 
@@ -72,46 +77,217 @@ def exract_com_height_oc(pos_data):
 
 
 def crop_signal(signal, max_height_index, sample_rate=60, time=6):
-
-    window_size = int(time * sample_rate)  # Tamanho fixo do array
+    return crop_window(signal, max_height_index, sample_rate, time).to_array()
+
+
+######################### Janelas alinhadas #########################
+
+# Janela de tamanho fixo sobre um sinal, sem cópia dos dados: as posições
+# [start, start + length) da janela correspondem a base[offset:offset + length] e as
+# demais são preenchimento (NaN quando a janela é convertida em array). Recorte e
+# sincronização pelo lag apenas alteram esses índices
+class AlignedSignal:
+    __slots__ = ("base", "offset", "length", "start", "size")
+
+    def __init__(self, base, offset, length, start, size):
+        self.base = base
+        self.offset = offset
+        self.length = max(length, 0)
+        self.start = start
+        self.size = size
+
+    # Amostras válidas da janela (view do sinal de origem)
+    @property
+    def values(self):
+        return self.base[self.offset:self.offset + self.length]
+
+    # Amostras das posições [start, stop) da janela, que devem ser válidas
+    def segment(self, start, stop):
+        first = self.offset + start - self.start
+        return self.base[first:first + max(stop - start, 0)]
+
+    # Janela deslocada `lag` posições para a esquerda, descartando as amostras que
+    # saem do início, com tamanho `size` (como em sync_signals)
+    def shifted(self, lag, size=None):
+        size = self.size if size is None else size
+        start = self.start - lag
+        skip = max(-start, 0)
+        length = min(self.length - skip, size - start - skip)
+        return AlignedSignal(self.base, self.offset + skip, length, start + skip, size)
+
+    # Array de tamanho fixo com NaN no preenchimento (mesmo resultado de crop_signal)
+    def to_array(self):
+        array = np.full(self.size, np.nan)
+        array[self.start:self.start + self.length] = self.values
+        return array
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.to_array()
+        return array if dtype is None else array.astype(dtype)
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return "AlignedSignal(offset={offset}, length={length}, start={start}, size={size})".format(
+            offset=self.offset, length=self.length, start=self.start, size=self.size)
+
+
+# Recorte de tamanho fixo (time * sample_rate) centrado em max_height_index, como
+# view do sinal. Amostras fora do sinal ficam como preenchimento
+def crop_window(signal, max_height_index, sample_rate=60, time=6):
+
+    window_size = int(time * sample_rate)  # Tamanho fixo da janela
     half_size = window_size // 2          # Metade do tamanho fixo
 
     # Define indices de corte
     start_index = max(max_height_index - half_size, 0)
     end_index = min(max_height_index + half_size, len(signal))
 
-    cropped_signal = signal[start_index:end_index]
+    # Posição do início do recorte na janela
+    start_insert = max(half_size - max_height_index, 0)
+
+    return AlignedSignal(signal, start_index, end_index - start_index, start_insert, window_size)
 
-    # Criar np array com NaN para padding
-    fixed_signal = np.full(window_size, np.nan)
 
-    # Insere no array de tamanho fixo
-    start_insert = max(half_size - max_height_index, 0)
-    fixed_signal[start_insert:start_insert + len(cropped_signal)] = cropped_signal
+# Trechos em que as duas janelas têm amostras válidas, como views dos sinais de origem
+def overlap(window1, window2):
+    start = max(window1.start, window2.start)
+    stop = min(window1.start + window1.length, window2.start + window2.length)
+    return window1.segment(start, stop), window2.segment(start, stop)
+
+
+
+######################### Estimação de lag #########################
+
+# Correlação cruzada por FFT, na convenção de scipy.signal.correlate (modo 'full'):
+# corr[k] = sum_n signal1[n + k] * signal2[n]. Opera no último eixo, aceitando pilhas 2-D.
+# Retorna os lags em ordem crescente e a correlação correspondente, limitados a |lag| <= max_lag
+def correlation_lags(signal1, signal2, max_lag=None):
+
+    len1, len2 = signal1.shape[-1], signal2.shape[-1]
+    n_fft = next_fast_len(len1 + len2 - 1)
+
+    corr = np.fft.irfft(np.fft.rfft(signal1, n_fft) * np.conj(np.fft.rfft(signal2, n_fft)), n_fft)
+
+    min_lag, max_lag_full = -(len2 - 1), len1 - 1
+    if max_lag is not None:
+        min_lag, max_lag_full = max(min_lag, -max_lag), min(max_lag_full, max_lag)
+
+    lags = np.arange(min_lag, max_lag_full + 1)
+    # Lags negativos ficam no final do vetor circular da FFT
+    return lags, corr[..., lags % n_fft]
+
+
+# Refinamento sub-amostra do pico por interpolação parabólica (três pontos).
+# Retorna o deslocamento do pico em relação a `index`, entre -0.5 e 0.5
+def parabolic_peak_offset(corr, index):
 
-    return fixed_signal
+    index = np.asarray(index)
+    inner = (index > 0) & (index < corr.shape[-1] - 1)
+    left  = np.take_along_axis(corr, np.clip(index - 1, 0, None)[..., np.newaxis], axis=-1)[..., 0]
+    mid   = np.take_along_axis(corr, index[..., np.newaxis], axis=-1)[..., 0]
+    right = np.take_along_axis(corr, np.clip(index + 1, None, corr.shape[-1] - 1)[..., np.newaxis], axis=-1)[..., 0]
 
+    denominator = left - 2 * mid + right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        offset = 0.5 * (left - right) / denominator
+    offset = np.where(inner & (denominator < 0), offset, 0.0)
 
+    return np.clip(offset, -0.5, 0.5)
 
-def calculate_lag(signal1, signal2):
+
+def calculate_lag(signal1, signal2, max_lag=None, subsample=False):
 
     # Calcula a correlação cruzada entre os dois sinais
     signal1 = signal1[~np.isnan(signal1)]
     signal2 = signal2[~np.isnan(signal2)]
 
-    correlation = correlate(signal1, signal2, mode='full')
+    lags, correlation = correlation_lags(signal1, signal2, max_lag)
 
     # Encontra o índice de máxima correlação
     max_corr_index = np.argmax(correlation)  # Índice onde a correlação é máxima
 
-    # Ajusta o índice para determinar o lag (diferença para o indice de maior correlação entre os sinais)
-    lag = max_corr_index - (len(signal2) - 1)
+    # Lag: diferença para o indice de maior correlação entre os sinais
+    lag = lags[max_corr_index]
+
+    if subsample:
+        return float(lag + parabolic_peak_offset(correlation, max_corr_index))
+
+    return int(lag)
+
+
+# Estimação de lag para vários pares de sinais em uma única chamada.
+# signals1 e signals2: arrays (pares x amostras). Valores NaN (preenchimento) são
+# tratados como zero, sem contribuir para a correlação
+def calculate_lags(signals1, signals2, max_lag=None, subsample=False):
+
+    signals1 = np.nan_to_num(np.atleast_2d(signals1), nan=0.0)
+    signals2 = np.nan_to_num(np.atleast_2d(signals2), nan=0.0)
+
+    lags, correlation = correlation_lags(signals1, signals2, max_lag)
+    max_corr_index = np.argmax(correlation, axis=-1)
 
-    return lag
+    if subsample:
+        return lags[max_corr_index] + parabolic_peak_offset(correlation, max_corr_index)
 
+    return lags[max_corr_index]
+
+
+# Correlação direta apenas nos lags informados (poucos lags, sinais longos)
+def correlation_at_lags(signal1, signal2, lags):
+    corr = np.empty(len(lags))
+    for i, lag in enumerate(lags):
+        if lag >= 0:
+            n = min(len(signal1) - lag, len(signal2))
+            corr[i] = np.dot(signal1[lag:lag + n], signal2[:n]) if n > 0 else 0.0
+        else:
+            n = min(len(signal1), len(signal2) + lag)
+            corr[i] = np.dot(signal1[:n], signal2[-lag:-lag + n]) if n > 0 else 0.0
+    return corr
+
+
+# Estimação em dois níveis: o lag é estimado com os sinais reamostrados para
+# coarse_rate e depois refinado na taxa original (sample_rate), buscando apenas
+# em torno do lag grosseiro. Retorna o lag em amostras da taxa original
+def calculate_lag_coarse_to_fine(signal1, signal2, sample_rate, coarse_rate, max_lag=None, subsample=True):
+
+    signal1 = signal1[~np.isnan(signal1)]
+    signal2 = signal2[~np.isnan(signal2)]
 
+    ratio = Fraction(coarse_rate / sample_rate).limit_denominator(1000)
+    coarse1 = resample_poly(signal1, ratio.numerator, ratio.denominator)
+    coarse2 = resample_poly(signal2, ratio.numerator, ratio.denominator)
+
+    scale = sample_rate / coarse_rate
+    coarse_max_lag = None if max_lag is None else int(np.ceil(max_lag / scale))
+    coarse_lag = calculate_lag(coarse1, coarse2, coarse_max_lag, subsample=True)
+
+    # Busca fina: uma amostra grosseira para cada lado do lag estimado
+    center = int(round(coarse_lag * scale))
+    half_width = int(np.ceil(scale)) + 1
+    lags = np.arange(center - half_width, center + half_width + 1)
+    lags = lags[(lags > -len(signal2)) & (lags < len(signal1))]
+    if max_lag is not None:
+        lags = lags[np.abs(lags) <= max_lag]
+
+    correlation = correlation_at_lags(signal1, signal2, lags)
+    max_corr_index = int(np.argmax(correlation))
+
+    if subsample:
+        return float(lags[max_corr_index] + parabolic_peak_offset(correlation, max_corr_index))
+
+    return int(lags[max_corr_index])
+
+
+# Aceita arrays (completados com NaN) ou janelas AlignedSignal; com janelas,
+# o resultado são as mesmas views deslocadas, sem cópia
 def sync_signals(signal1, signal2, lag):
 
+    if isinstance(signal1, AlignedSignal):
+        size = max(signal1.size, signal2.size)
+        return signal1.shifted(max(lag, 0), size), signal2.shifted(max(-lag, 0), size)
+
     len1, len2 = len(signal1), len(signal2)
 
     max_len = max(len1,len2)
@@ -138,44 +314,92 @@ def sync_signals(signal1, signal2, lag):
 
 
 
+# Os sinais podem ser arrays ou janelas AlignedSignal, convertidas em arrays
+# apenas quando o gráfico é gerado
 def compare_signals(fp_signal, oc_signal,oc_time, title, cp_directory,file_name):
 
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(oc_time, oc_signal, label="Open Cap", color='red', alpha=0.7)
-    plt.plot(oc_time, fp_signal, label="Plataforma de força", color='green', alpha=0.7)
-    plt.xlabel('Tempo (s)')
-    plt.ylabel('Amplitude')
-    plt.title(title)
-    plt.legend()
-
     file_name = title+"_" +file_name
 
-    var_fig_path = os.path.join(cp_directory,file_name)
-    plt.grid(True)
-    plt.savefig(var_fig_path, dpi=300,format='png')
+    if render_f.rendering_enabled():
+        series_list = [
+            render_f.series(oc_time, oc_signal, label="Open Cap", color='red', alpha=0.7),
+            render_f.series(oc_time, fp_signal, label="Plataforma de força", color='green', alpha=0.7),
+        ]
 
-    plt.close()
+        var_fig_path = os.path.join(cp_directory,file_name)
+        render_f.line_plot(var_fig_path, series_list, title, 'Tempo (s)', 'Amplitude',
+                           figsize=(10, 6), dpi=300, format='png')
 
     mae = normalized_mae(fp_signal, oc_signal)
     print("[{file_name}] MAE: {mae:.4f}".format(file_name = file_name, mae=mae))
     return mae
 
+# Lê um arquivo intermediário: formato binário colunar (.npy, por memory-map)
+# ou texto exportado (.txt)
 def load_data_from_file(file_name):
 
+    if file_name.endswith(col_f.COLUMNAR_EXTENSION):
+        data, _ = col_f.read_columns(file_name)
+        return data
+
     data = np.loadtxt(file_name, delimiter=',', skiprows=1)
     return data
 
 
-def downsample_multicolumn(jp_data, fp_sample_rate, oc_sample_rate):
+######################### Reamostragem #########################
+
+# Métodos de reamostragem
+RESAMPLE_SINC      = "sinc"       # Sinc de banda limitada (resampy)
+RESAMPLE_POLYPHASE = "polyphase"  # Razão racional polifásica (scipy.signal.resample_poly)
+RESAMPLE_INTERP    = "interp"     # Interpolação linear nos instantes de destino (np.interp)
 
-    downsampled_columns = []
+RESAMPLE_ENGINES = [RESAMPLE_SINC, RESAMPLE_POLYPHASE, RESAMPLE_INTERP]
 
-    for i in range(jp_data.shape[1]):
-        downsampled_column = resample(jp_data[:, i],fp_sample_rate,oc_sample_rate)
-        downsampled_columns.append(downsampled_column)
 
-    jp_data_downsampled = np.column_stack(downsampled_columns)
+# Fatores inteiros up/down da conversão fs_in -> fs_out
+def resample_factors(fs_in, fs_out):
+    ratio = Fraction(fs_out).limit_denominator(1000) / Fraction(fs_in).limit_denominator(1000)
+    return ratio.numerator, ratio.denominator
+
+
+# Filtro anti-aliasing da reamostragem polifásica, projetado uma vez por par (fs_in, fs_out)
+# (mesmo projeto padrão de resample_poly: FIR com janela de Kaiser)
+@lru_cache(maxsize=32)
+def polyphase_kernel(fs_in, fs_out):
+    up, down = resample_factors(fs_in, fs_out)
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    kernel = firwin(2 * half_len + 1, 1 / max_rate, window=('kaiser', 5.0))
+    kernel.setflags(write=False)
+    return kernel
+
+
+# Reamostra todas as colunas de jp_data (amostras x colunas) em uma única chamada.
+# No método "interp" a primeira coluna é o tempo; os instantes de destino são
+# target_time (ex: tempos dos quadros do OpenCap) ou uma grade uniforme em fs_out
+def downsample_multicolumn(jp_data, fp_sample_rate, oc_sample_rate, engine=RESAMPLE_SINC, target_time=None):
+
+    jp_data = np.asarray(jp_data)
+
+    if engine == RESAMPLE_SINC:
+        jp_data_downsampled = resample(jp_data, fp_sample_rate, oc_sample_rate, axis=0)
+
+    elif engine == RESAMPLE_POLYPHASE:
+        up, down = resample_factors(fp_sample_rate, oc_sample_rate)
+        jp_data_downsampled = resample_poly(jp_data, up, down, axis=0,
+                                            window=polyphase_kernel(fp_sample_rate, oc_sample_rate))
+
+    elif engine == RESAMPLE_INTERP:
+        time = jp_data[:, 0]
+        if target_time is None:
+            target_time = np.arange(time[0], time[-1], 1 / oc_sample_rate)
+        jp_data_downsampled = np.empty((len(target_time), jp_data.shape[1]))
+        jp_data_downsampled[:, 0] = target_time
+        for i in range(1, jp_data.shape[1]):
+            jp_data_downsampled[:, i] = np.interp(target_time, time, jp_data[:, i])
+
+    else:
+        raise ValueError("Método de reamostragem inválido: {engine}".format(engine=engine))
 
     return jp_data_downsampled
 
@@ -186,14 +410,19 @@ def normalized_mae(fp_signal, oc_signal):
     # Calcula o MAE (Mean Absolute Error) normalizado entre dois sinais numpy,
     # desconsiderando valores NaN e 
     # utiliza amplitude (pico a vale) do da plataforma de força por ser menos ruidoso.
-    
-    if fp_signal.shape != oc_signal.shape:
-        raise ValueError("Os sinais devem ter o mesmo tamanho.")
+    # Com janelas AlignedSignal, o cálculo é feito diretamente sobre o trecho em que
+    # as duas têm amostras válidas, sem máscara nem cópia
 
-    
-    valid_mask = ~np.isnan(fp_signal) & ~np.isnan(oc_signal) # Máscara para ignorar dados de preenchimento (NaN)
-    valid_fp_signal = fp_signal[valid_mask]
-    valid_oc_signal = oc_signal[valid_mask]
+    if isinstance(fp_signal, AlignedSignal):
+        if fp_signal.size != oc_signal.size:
+            raise ValueError("Os sinais devem ter o mesmo tamanho.")
+        valid_fp_signal, valid_oc_signal = overlap(fp_signal, oc_signal)
+    else:
+        if fp_signal.shape != oc_signal.shape:
+            raise ValueError("Os sinais devem ter o mesmo tamanho.")
+        valid_mask = ~np.isnan(fp_signal) & ~np.isnan(oc_signal) # Máscara para ignorar dados de preenchimento (NaN)
+        valid_fp_signal = fp_signal[valid_mask]
+        valid_oc_signal = oc_signal[valid_mask]
 
     if valid_fp_signal.size == 0 or valid_oc_signal.size == 0:
         raise ValueError("Os sinais não contêm valores para cálculo.")
@@ -0,0 +1,186 @@
+# Arquivo: render_functions.py
+#
+# :: Subsistema de renderização de gráficos
+# :: Os gráficos são descritos como tarefas (séries + rótulos) e renderizados em um
+# :: canvas Agg reaproveitado por processo, opcionalmente em uma thread de fundo,
+# :: de forma que o cálculo não espere pela codificação dos arquivos PNG
+
+import os
+import queue
+import atexit
+import threading
+import numpy as np
+import utils.trace_functions as trace_f
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from multiprocessing.util import Finalize
+
+
+# Modos de renderização
+RENDER_FULL    = "full"     # Resolução final (dpi=300)
+RENDER_PREVIEW = "preview"  # Prévia em baixa resolução
+RENDER_NONE    = "none"     # Apenas métricas, nenhum gráfico é gerado
+
+RENDER_MODES = [RENDER_FULL, RENDER_PREVIEW, RENDER_NONE]
+
+FULL_DPI    = 300
+PREVIEW_DPI = 72
+
+render_config = {
+    "mode":       RENDER_FULL,
+    "background": True,
+}
+
+
+def configure(mode=None, background=None):
+    if mode is not None:
+        if mode not in RENDER_MODES:
+            raise ValueError("Modo de renderização inválido: {mode}".format(mode=mode))
+        render_config["mode"] = mode
+    if background is not None:
+        render_config["background"] = background
+
+
+def rendering_enabled():
+    return render_config["mode"] != RENDER_NONE
+
+
+def render_dpi(dpi=FULL_DPI):
+    if render_config["mode"] == RENDER_PREVIEW:
+        return min(dpi, PREVIEW_DPI)
+    return dpi
+
+
+# Descrição de uma série do gráfico. Os dados são copiados para que o chamador
+# possa reutilizar seus arrays enquanto a renderização ocorre em segundo plano
+def series(x, y, **style):
+    return {"x": np.array(x, dtype=float), "y": np.array(y, dtype=float), "style": style}
+
+
+######################### Canvas #########################
+
+# Uma figura Agg por tamanho, reaproveitada entre gráficos do mesmo processo.
+# Apenas uma thread renderiza por vez (a thread de fundo ou o chamador)
+_canvases = {}
+
+def get_canvas(figsize):
+    if figsize not in _canvases:
+        figure = Figure(figsize=figsize)
+        FigureCanvasAgg(figure)
+        _canvases[figsize] = figure
+    figure = _canvases[figsize]
+    figure.clear()
+    return figure
+
+
+def render_line_plot(job):
+    with trace_f.span("render.png", "render", dpi=job["dpi"]):
+        draw_line_plot(job)
+
+
+def draw_line_plot(job):
+    figure = get_canvas(job["figsize"])
+    ax = figure.add_subplot(111)
+
+    for s in job["series"]:
+        ax.plot(s["x"], s["y"], **s["style"])
+
+    ax.set_title(job["title"])
+    ax.set_xlabel(job["xlabel"])
+    ax.set_ylabel(job["ylabel"])
+    if job["grid"]:
+        ax.grid(True)
+    if job["legend"]:
+        ax.legend()
+
+    figure.savefig(job["path"], dpi=job["dpi"], format=job["format"])
+    figure.clear()
+
+
+######################### Fila de renderização #########################
+
+# Estado da fila por processo (processos criados por fork não herdam a thread)
+_render_state = {"pid": None, "queue": None, "thread": None, "errors": []}
+
+def render_worker(render_queue):
+    while True:
+        job = render_queue.get()
+        try:
+            render_line_plot(job)
+        except Exception as e:
+            _render_state["errors"].append((job["path"], e))
+        finally:
+            render_queue.task_done()
+
+
+def get_render_queue():
+    if _render_state["pid"] != os.getpid() or not _render_state["thread"].is_alive():
+        render_queue = queue.Queue()
+        thread = threading.Thread(target=render_worker, args=(render_queue,), daemon=True)
+        thread.start()
+        _render_state.update(pid=os.getpid(), queue=render_queue, thread=thread, errors=[])
+
+        # Os gráficos pendentes são concluídos ao fim do processo: atexit no processo
+        # principal e finalizador do multiprocessing nos processos de trabalho
+        atexit.register(flush)
+        Finalize(None, flush, exitpriority=10)
+    return _render_state["queue"]
+
+
+# Agenda (ou executa, sem thread de fundo) a renderização de um gráfico de linhas
+def line_plot(path, series_list, title, xlabel, ylabel, figsize=(8, 6),
+              dpi=FULL_DPI, grid=True, legend=True, format=None):
+
+    if not rendering_enabled():
+        return
+
+    job = {
+        "path":    path,
+        "series":  series_list,
+        "title":   title,
+        "xlabel":  xlabel,
+        "ylabel":  ylabel,
+        "figsize": tuple(figsize),
+        "dpi":     render_dpi(dpi),
+        "grid":    grid,
+        "legend":  legend,
+        "format":  format,
+    }
+
+    if render_config["background"]:
+        get_render_queue().put(job)
+    else:
+        render_line_plot(job)
+
+
+# Aguarda a conclusão de todos os gráficos pendentes do processo e informa os que
+# não puderam ser salvos. Retorna a lista de (arquivo, erro) dessas falhas
+def flush():
+    if _render_state["pid"] != os.getpid() or _render_state["queue"] is None:
+        return []
+    _render_state["queue"].join()
+
+    errors, _render_state["errors"] = _render_state["errors"], []
+    for path, e in errors:
+        print("Erro ao salvar o gráfico {path}: {erro}".format(path=path, erro=e))
+    if errors:
+        print("{n} gráfico(s) não foram salvos".format(n=len(errors)))
+    return errors
+
+
+# Exibe o gráfico de forma interativa (pyplot), fora do subsistema de renderização
+def show_line_plot(series_list, title, xlabel, ylabel, figsize=(8, 6), grid=True, legend=True):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=figsize)
+    for s in series_list:
+        plt.plot(s["x"], s["y"], **s["style"])
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    if grid:
+        plt.grid(True)
+    if legend:
+        plt.legend()
+    plt.show()
+    plt.close()
@@ -0,0 +1,191 @@
+# Arquivo: results_functions.py
+#
+# :: Banco de resultados (SQLite) de todas as execuções
+# :: Cada execução registra seus parâmetros e as métricas de cada ensaio (MAE da
+# :: comparação, métricas de salto e da comparação em lote) em tabelas indexadas por
+# :: voluntário, ensaio e métrica, em uma única transação. Os registros nunca são
+# :: alterados: uma nova execução acrescenta novos valores, e a visão latest_metrics
+# :: retorna o valor mais recente de cada métrica de cada ensaio
+# ::
+# :: Exemplo (velocidade, MAE normalizado acima de 0.2 em saltos CMJ):
+# ::     SELECT subject, trial, value FROM latest_metrics
+# ::     WHERE metric = 'nmae' AND channel = 'vel' AND jump_type = 'CMJ' AND value > 0.2
+
+import json
+import time
+import sqlite3
+import numpy as np
+import pandas as pd
+
+
+RESULTS_FILE = "results.sqlite"
+SCHEMA_VERSION = 1
+
+# Origem das métricas
+SOURCE_COMPARE      = "compare"        # MAE normalizado de cada par (plot_signals)
+SOURCE_JUMP_METRICS = "jump_metrics"   # Métricas de salto (--metrics)
+SOURCE_COHORT       = "cohort"         # Comparação em lote (--cohort)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY,
+    started_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS run_params (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name   TEXT NOT NULL,
+    value  TEXT,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS subjects (
+    id   INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS trials (
+    id         INTEGER PRIMARY KEY,
+    subject_id INTEGER NOT NULL REFERENCES subjects(id),
+    trial      TEXT NOT NULL,
+    jump_type  TEXT,
+    UNIQUE (subject_id, trial)
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    id       INTEGER PRIMARY KEY,
+    run_id   INTEGER NOT NULL REFERENCES runs(id),
+    trial_id INTEGER NOT NULL REFERENCES trials(id),
+    source   TEXT NOT NULL,
+    channel  TEXT NOT NULL DEFAULT '',
+    metric   TEXT NOT NULL,
+    value    REAL
+);
+CREATE INDEX IF NOT EXISTS idx_trials_subject ON trials (subject_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_trial  ON metrics (trial_id, source, channel, metric);
+CREATE INDEX IF NOT EXISTS idx_metrics_metric ON metrics (metric, channel, value);
+CREATE INDEX IF NOT EXISTS idx_metrics_run    ON metrics (run_id);
+CREATE VIEW IF NOT EXISTS latest_metrics AS
+    SELECT s.name AS subject, t.trial, t.jump_type, m.source, m.channel, m.metric, m.value, m.run_id
+    FROM metrics m
+    JOIN trials t   ON t.id = m.trial_id
+    JOIN subjects s ON s.id = t.subject_id
+    WHERE m.id = (SELECT MAX(m2.id) FROM metrics m2
+                  WHERE m2.trial_id = m.trial_id AND m2.source = m.source
+                    AND m2.channel = m.channel AND m2.metric = m.metric);
+"""
+
+
+######################### Banco #########################
+
+def connect(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    connection.execute("PRAGMA user_version = {version}".format(version=SCHEMA_VERSION))
+    return connection
+
+
+# Valor gravável no banco: números numpy convertidos, NaN como NULL
+def db_value(value):
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+# Métricas de uma execução acumuladas em memória e gravadas de uma vez (save)
+class ResultsBatch:
+
+    def __init__(self, params=None):
+        self.started_at = time.time()
+        self.params = dict(params or {})
+        self.trials = {}     # (voluntário, ensaio) -> tipo de salto
+        self.rows = []       # (voluntário, ensaio, origem, canal, métrica, valor)
+
+    def add_trial(self, subject, trial, jump_type=None):
+        key = (str(subject), str(trial))
+        if jump_type is not None or key not in self.trials:
+            self.trials[key] = jump_type
+
+    def add(self, subject, trial, source, metrics, channel=''):
+        if (str(subject), str(trial)) not in self.trials:
+            self.add_trial(subject, trial)
+        for metric, value in metrics.items():
+            self.rows.append((str(subject), str(trial), source, channel, metric, db_value(value)))
+
+    # Tabela (DataFrame) com colunas de voluntário e ensaio; colunas "<canal>_<métrica>"
+    # são separadas em canal e métrica quando o canal está em `channels`
+    def add_table(self, table, source, subject_column='subject', trial_column='trial', channels=(),
+                  skip_columns=()):
+        skip = {subject_column, trial_column} | set(skip_columns)
+        columns = [c for c in table.columns if c not in skip and pd.api.types.is_numeric_dtype(table[c])]
+        for row in table.itertuples(index=False):
+            row = row._asdict()
+            for column in columns:
+                channel, metric = split_column(column, channels)
+                self.add(row[subject_column], row[trial_column], source, {metric: row[column]}, channel)
+
+    # Grava a execução, seus parâmetros, voluntários, ensaios e métricas em uma transação
+    def save(self, db_path):
+        connection = connect(db_path)
+        try:
+            with connection:
+                run_id = connection.execute("INSERT INTO runs (started_at, finished_at) VALUES (?, ?)",
+                                            (self.started_at, time.time())).lastrowid
+                connection.executemany("INSERT INTO run_params (run_id, name, value) VALUES (?, ?, ?)",
+                                       [(run_id, name, json.dumps(value)) for name, value in sorted(self.params.items())])
+
+                subjects = sorted({subject for subject, _ in self.trials})
+                connection.executemany("INSERT OR IGNORE INTO subjects (name) VALUES (?)", [(s,) for s in subjects])
+                subject_ids = dict(connection.execute("SELECT name, id FROM subjects"))
+
+                connection.executemany("INSERT OR IGNORE INTO trials (subject_id, trial) VALUES (?, ?)",
+                                       [(subject_ids[s], t) for s, t in self.trials])
+                connection.executemany("UPDATE trials SET jump_type = ? WHERE subject_id = ? AND trial = ?",
+                                       [(jump_type, subject_ids[s], t) for (s, t), jump_type in self.trials.items()
+                                        if jump_type is not None])
+                trial_ids = {(name, trial): trial_id for trial_id, name, trial in connection.execute(
+                    "SELECT t.id, s.name, t.trial FROM trials t JOIN subjects s ON s.id = t.subject_id")}
+
+                connection.executemany(
+                    "INSERT INTO metrics (run_id, trial_id, source, channel, metric, value) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run_id, trial_ids[(s, t)], source, channel, metric, value)
+                     for s, t, source, channel, metric, value in self.rows])
+        finally:
+            connection.close()
+
+        print("{n} métricas de {t} ensaios gravadas em {path}".format(n=len(self.rows), t=len(self.trials), path=db_path))
+        return run_id
+
+
+def split_column(column, channels):
+    channel, _, metric = column.partition('_')
+    if metric and channel in channels:
+        return channel, metric
+    return '', column
+
+
+######################### Consultas #########################
+
+# Valores mais recentes de uma métrica, opcionalmente filtrados por canal, origem,
+# tipo de salto, voluntário e valor mínimo/máximo. Retorna um DataFrame
+def query_metrics(db_path, metric, channel=None, source=None, jump_type=None, subject=None,
+                  min_value=None, max_value=None):
+
+    conditions, args = ["metric = ?"], [metric]
+    for column, value in (("channel", channel), ("source", source), ("jump_type", jump_type), ("subject", subject)):
+        if value is not None:
+            conditions.append(column + " = ?")
+            args.append(value)
+    if min_value is not None:
+        conditions.append("value > ?")
+        args.append(min_value)
+    if max_value is not None:
+        conditions.append("value < ?")
+        args.append(max_value)
+
+    connection = connect(db_path)
+    try:
+        return pd.read_sql_query("SELECT * FROM latest_metrics WHERE " + " AND ".join(conditions) +
+                                 " ORDER BY subject, trial", connection, params=args)
+    finally:
+        connection.close()
@@ -0,0 +1,450 @@
+# Arquivo: stream_functions.py
+#
+# :: Análise em tempo real dos dados da plataforma de força
+# :: As amostras chegam em blocos (arquivo em gravação, pipe ou socket), são
+# :: filtradas de forma causal (SOS com estado mantido entre blocos) e integradas
+# :: incrementalmente para velocidade e deslocamento. As fases do salto são
+# :: detectadas à medida que as amostras chegam e a altura do salto é emitida
+# :: no bloco que contém a aterrissagem.
+# :: O filtro causal atrasa o sinal (alguns ms a 30 Hz), diferente do filtro de
+# :: fase zero (ida e volta) da análise completa em runAnalysisCMJSJ
+# ::
+# :: Uso (a partir do diretório do projeto):
+# ::     python -m utils.stream_functions --replay ensaio.acp [--speed 1]
+# ::     python -m utils.stream_functions --tail ensaio.acp
+# ::     python -m utils.stream_functions --write-replay ensaio.acp | python -m utils.stream_functions --stdin
+
+import sys
+import time
+import argparse
+import numpy as np
+from scipy import signal
+import utils.jumpy_functions as jp_f
+import utils.filter_functions as filt_f
+import utils.metadata_functions as meta_f
+
+
+# Amostras por bloco (a 1 kHz, 50 ms de latência máxima de leitura)
+STREAM_BLOCK_SIZE       = 50
+# Janela parada no início do registro usada para estimar o peso e o ruído (s)
+STREAM_QUIET_TIME       = 0.5
+# Desvios padrão da aceleração parada que caracterizam o início do movimento
+STREAM_ONSET_SD         = 5
+# Voo: força abaixo desta fração do peso corporal
+STREAM_FLIGHT_FRACTION  = 0.05
+# Tempo após a aterrissagem até que um novo salto possa ser detectado (s)
+STREAM_RESET_TIME       = 1.0
+
+FORCE_COLUMN = 'Raw Fz (N)'
+TIME_COLUMN  = 'Time (s)'
+
+# Estados da detecção de fases
+CALIBRATING = "calibrating"
+READY       = "ready"
+UNWEIGHTING = "unweighting"
+BRAKING     = "braking"
+PROPULSION  = "propulsion"
+FLIGHT      = "flight"
+LANDED      = "landed"
+
+
+######################### Análise #########################
+
+# Filtragem causal, integração e detecção de fases de um fluxo de amostras de força.
+# update() recebe um bloco e retorna as amostras concluídas (tempo, força filtrada,
+# aceleração, velocidade e deslocamento) e os eventos detectados no bloco.
+# A velocidade e o deslocamento de uma amostra dependem das amostras seguintes
+# (integração trapezoidal), por isso cada bloco retorna as amostras com 2 amostras
+# de atraso; close() conclui as restantes
+class StreamingAnalyzer:
+
+    def __init__(self, fs, mass, jump_type=None, cutoff_frequency=jp_f.FILTER_CUTOFF_FREQUENCY,
+                 order=jp_f.FILTER_ORDER, filter_type=jp_f.FILTER_TYPE):
+        self.fs = fs
+        self.mass = mass
+        self.jump_type = jump_type
+
+        self.sos = np.array(filt_f.sos_design(filter_type, int(order), float(cutoff_frequency), float(fs)))
+        self.zi = None
+
+        self.vel_integrator = jp_f.ChunkedIntegrator(fs)
+        self.disp_integrator = jp_f.ChunkedIntegrator(fs)
+
+        # Amostras aguardando a integração
+        self.pending = {"time": np.empty(0), "force": np.empty(0), "acel": np.empty(0), "vel": np.empty(0)}
+        self.n_samples = 0
+        self.n_emitted = 0
+        self.closed = False
+        self.quiet_samples = max(int(STREAM_QUIET_TIME * fs), 2)
+        self.unscaled = []
+
+        # Detecção de fases
+        self.state = CALIBRATING
+        self.quiet = []
+        self.acel_mean = None
+        self.acel_sd = None
+        self.weight = None
+        self.jump = {}
+        self.jumps = []
+
+    def filter(self, force):
+        if self.zi is None:
+            # Estado inicial em regime permanente no valor da primeira amostra
+            self.zi = signal.sosfilt_zi(self.sos) * force[0]
+        filtered, self.zi = signal.sosfilt(self.sos, force, zi=self.zi)
+        return filtered
+
+    def update(self, force, time=None):
+        force = np.asarray(force, dtype=float).ravel()
+        if time is None:
+            time = (self.n_samples + np.arange(len(force))) / self.fs
+        self.n_samples += len(force)
+        if len(force) == 0:
+            return self.emit(0, np.empty(0))
+
+        filtered = self.filter(force)
+        time = np.asarray(time, dtype=float)
+
+        # Sem massa no cabeçalho: estimada pelo peso na janela parada inicial
+        if not self.mass:
+            self.unscaled.append((time, filtered))
+            if sum(len(f) for _, f in self.unscaled) < self.quiet_samples:
+                return self.emit(0, np.empty(0))
+            time = np.concatenate([t for t, _ in self.unscaled])
+            filtered = np.concatenate([f for _, f in self.unscaled])
+            self.mass = float(np.mean(filtered[:self.quiet_samples])) / jp_f.g
+            self.unscaled = []
+
+        acel = (filtered / self.mass) - jp_f.g
+        vel = self.vel_integrator.update(acel)
+        disp = self.disp_integrator.update(vel)
+
+        self.append_pending(time=time, force=filtered, acel=acel, vel=vel)
+        return self.emit(len(disp), disp)
+
+    # Conclui as últimas amostras repetindo o último valor integrado, como integrateSignal
+    def close(self):
+        if self.closed or self.n_samples == 0 or not self.mass:
+            return self.emit(0, np.empty(0))
+        self.closed = True
+        vel = self.vel_integrator.finalize()
+        disp = np.concatenate((self.disp_integrator.update(vel), self.disp_integrator.finalize()))
+        self.append_pending(vel=vel)
+        return self.emit(len(disp), disp)
+
+    def append_pending(self, **columns):
+        for key, values in columns.items():
+            self.pending[key] = np.concatenate((self.pending[key], values))
+
+    def emit(self, n, disp):
+        block = {key: values[:n] for key, values in self.pending.items()}
+        block["disp"] = disp
+        block["index"] = self.n_emitted + np.arange(n)
+        self.pending = {key: values[n:] for key, values in self.pending.items()}
+        self.n_emitted += n
+        block["events"] = self.detect(block) if n else []
+        return block
+
+    ######################### Fases #########################
+
+    def event(self, name, block, i, **values):
+        event = {"event": name, "index": int(block["index"][i]), "time": float(block["time"][i])}
+        event.update(values)
+        return event
+
+    # Máquina de estados sobre as amostras concluídas do bloco. Cada transição busca
+    # (vetorizada) a primeira amostra que satisfaz a condição do estado atual
+    def detect(self, block):
+        events = []
+        acel, vel, force, t = block["acel"], block["vel"], block["force"], block["time"]
+        i = 0
+        n = len(acel)
+
+        while i < n:
+            if self.state == CALIBRATING:
+                needed = self.quiet_samples - sum(len(q) for q in self.quiet)
+                self.quiet.append(acel[i:i + needed])
+                i += needed
+                if sum(len(q) for q in self.quiet) >= self.quiet_samples:
+                    quiet = np.concatenate(self.quiet)
+                    self.acel_mean, self.acel_sd = float(np.mean(quiet)), float(np.std(quiet))
+                    self.weight = self.mass * (self.acel_mean + jp_f.g)
+                    self.quiet = []
+                    self.state = READY
+                    events.append(self.event("ready", block, min(i, n) - 1, weight=self.weight))
+                continue
+
+            if self.state == READY:
+                k = first_index(np.abs(acel[i:] - self.acel_mean) > STREAM_ONSET_SD * self.acel_sd)
+                if k is None:
+                    break
+                i += k
+                self.jump = {"init_movement": t[i], "vel_end_braking": 0.0}
+                events.append(self.event("init_movement", block, i))
+                # Início para cima (ex: squat jump): não há descarga nem frenagem
+                if self.jump_type == "SJ" or acel[i] > self.acel_mean:
+                    self.jump.update(end_unweighting=t[i], end_braking=t[i])
+                    self.state = PROPULSION
+                else:
+                    self.state = UNWEIGHTING
+                continue
+
+            if self.state == UNWEIGHTING:
+                # Fim da descarga: velocidade mínima (aceleração volta a ser positiva)
+                k = first_index(acel[i:] >= 0)
+                if k is None:
+                    break
+                i += k
+                self.jump["end_unweighting"] = t[i]
+                events.append(self.event("end_unweighting", block, i, velocity=float(vel[i])))
+                self.state = BRAKING
+                continue
+
+            if self.state == BRAKING:
+                # Fim da frenagem: deslocamento mínimo (velocidade volta a ser positiva)
+                k = first_index(vel[i:] >= 0)
+                if k is None:
+                    break
+                i += k
+                self.jump.update(end_braking=t[i], vel_end_braking=float(vel[i]))
+                events.append(self.event("end_braking", block, i, displacement=float(block["disp"][i])))
+                self.state = PROPULSION
+                continue
+
+            if self.state == PROPULSION:
+                k = first_index(force[i:] < STREAM_FLIGHT_FRACTION * self.weight)
+                if k is None:
+                    break
+                i += k
+                self.jump.update(end_propulsion=t[i], takeoff_velocity=float(vel[i]))
+                events.append(self.event("end_propulsion", block, i, takeoff_velocity=float(vel[i])))
+                self.state = FLIGHT
+                continue
+
+            if self.state == FLIGHT:
+                k = first_index(force[i:] >= STREAM_FLIGHT_FRACTION * self.weight)
+                if k is None:
+                    break
+                i += k
+                self.jump["end_flight"] = t[i]
+                metrics = jump_metrics(self.jump, self.mass)
+                self.jumps.append(metrics)
+                events.append(self.event("end_flight", block, i))
+                events.append(self.event("jump", block, i, **metrics))
+                self.state = LANDED
+                continue
+
+            if self.state == LANDED:
+                # Novo salto somente após STREAM_RESET_TIME e de volta à faixa parada
+                settled = (t[i:] >= self.jump["end_flight"] + STREAM_RESET_TIME) & \
+                          (np.abs(acel[i:] - self.acel_mean) <= STREAM_ONSET_SD * self.acel_sd)
+                k = first_index(settled)
+                if k is None:
+                    break
+                i += k
+                self.state = READY
+                continue
+
+        return events
+
+
+def first_index(condition):
+    index = np.argmax(condition) if len(condition) else 0
+    if len(condition) == 0 or not condition[index]:
+        return None
+    return int(index)
+
+
+# Métricas de um salto a partir dos instantes e velocidades das fases
+# (mesmos nomes da tabela de jump_metrics_functions)
+def jump_metrics(jump, mass):
+    flight_time = jump["end_flight"] - jump["end_propulsion"]
+    jump_height_flight = jp_f.g * flight_time ** 2 / 8
+    time_to_takeoff = jump["end_propulsion"] - jump["init_movement"]
+    return {
+        "init_movement":       float(jump["init_movement"]),
+        "end_unweighting":     float(jump["end_unweighting"]),
+        "end_braking":         float(jump["end_braking"]),
+        "end_propulsion":      float(jump["end_propulsion"]),
+        "end_flight":          float(jump["end_flight"]),
+        "takeoff_velocity":    jump["takeoff_velocity"],
+        "flight_time":         float(flight_time),
+        "jump_height_takeoff": jump["takeoff_velocity"] ** 2 / (2 * jp_f.g),
+        "jump_height_flight":  float(jump_height_flight),
+        "propulsion_impulse":  mass * (jump["takeoff_velocity"] - jump["vel_end_braking"]),
+        "time_to_takeoff":     float(time_to_takeoff),
+        "rsi_modified":        float(jump_height_flight / time_to_takeoff) if time_to_takeoff > 0 else float('nan'),
+    }
+
+
+######################### Fontes #########################
+
+# Leitura de um arquivo em gravação: readline aguarda novas linhas completas e
+# retorna '' (fim) após idle_timeout segundos sem dados
+class FollowReader:
+
+    def __init__(self, f, poll_interval=0.01, idle_timeout=5.0):
+        self.f = f
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.partial = ''
+
+    def readline(self):
+        idle_since = time.time()
+        while True:
+            line = self.f.readline()
+            if line:
+                idle_since = time.time()
+                self.partial += line
+                if self.partial.endswith('\n'):
+                    line, self.partial = self.partial, ''
+                    return line
+                continue
+            if self.idle_timeout is not None and time.time() - idle_since > self.idle_timeout:
+                line, self.partial = self.partial, ''
+                return line
+            time.sleep(self.poll_interval)
+
+
+# Blocos (linhas x colunas) do bloco numérico de um fluxo ACP em texto. `f` é
+# qualquer objeto com readline(): arquivo, sys.stdin (pipe), socket.makefile('r')
+# ou FollowReader (arquivo em gravação). O cabeçalho é lido antes do primeiro bloco
+def acp_blocks(f, block_size=STREAM_BLOCK_SIZE):
+    rows = []
+    for line in iter(f.readline, ''):
+        values = line.split()
+        if not values:
+            continue
+        rows.append([float(v) for v in values])
+        if len(rows) >= block_size:
+            yield np.array(rows)
+            rows = []
+    if rows:
+        yield np.array(rows)
+
+
+# Passa os blocos (linhas x colunas, na ordem de var_names) pelo analisador,
+# chamando on_block para cada bloco concluído e on_event para cada evento
+def run_blocks(blocks, var_names, jump_type, mass, data_rate, on_event=None, on_block=None):
+    force_column = var_names.index(FORCE_COLUMN)
+    time_column = var_names.index(TIME_COLUMN)
+
+    analyzer = None
+
+    def handle(block):
+        if on_block is not None:
+            on_block(block)
+        if on_event is not None:
+            for event in block["events"]:
+                on_event(event)
+
+    for rows in blocks:
+        if analyzer is None:
+            # Sem taxa no cabeçalho: estimada pela coluna de tempo do primeiro bloco.
+            # Sem massa, o analisador a estima pelo peso na janela parada inicial
+            data_rate = data_rate or meta_f.estimate_sample_rate(rows[:, time_column])
+            if not data_rate:
+                raise ValueError("Taxa de amostragem não encontrada no cabeçalho nem na coluna de tempo")
+            analyzer = StreamingAnalyzer(data_rate, mass, jump_type)
+        handle(analyzer.update(rows[:, force_column], rows[:, time_column]))
+    if analyzer is not None:
+        handle(analyzer.close())
+
+    return analyzer
+
+
+# Analisa um fluxo ACP completo (cabeçalho + dados)
+def analyze_stream(f, block_size=STREAM_BLOCK_SIZE, on_event=None, on_block=None):
+    var_names, jump_type, mass, data_rate = jp_f.readForceHeader(f)
+    return run_blocks(acp_blocks(f, block_size), var_names, jump_type, mass, data_rate, on_event, on_block)
+
+
+######################### Reprodução #########################
+
+# Dados e metadados de um arquivo ACP, com massa e taxa resolvidas como na análise completa
+def read_replay(file_path):
+    fp_data, var_names, jump_type, mass, data_rate = jp_f.readForceFile(file_path)
+    mass, data_rate = meta_f.resolve(file_path, mass, data_rate, fp_data[TIME_COLUMN], fp_data[FORCE_COLUMN])
+    data = np.column_stack([fp_data[name] for name in var_names])
+    return data, var_names, jump_type, mass, data_rate
+
+
+# Blocos dos dados de um arquivo ACP (read_replay) entregues na taxa registrada
+# (speed > 1 acelera; speed=None entrega sem espera)
+def replay_blocks(data, data_rate, block_size=STREAM_BLOCK_SIZE, speed=1.0):
+    start = time.time()
+    for i in range(0, len(data), block_size):
+        if speed:
+            # Um bloco fica disponível quando sua última amostra teria sido registrada
+            wait = start + (min(i + block_size, len(data)) / data_rate) / speed - time.time()
+            if wait > 0:
+                time.sleep(wait)
+        yield data[i:i + block_size]
+
+
+# Analisa um arquivo ACP como se as amostras chegassem da plataforma
+def replay(file_path, block_size=STREAM_BLOCK_SIZE, speed=1.0, on_event=None, on_block=None):
+    data, var_names, jump_type, mass, data_rate = read_replay(file_path)
+    blocks = replay_blocks(data, data_rate, block_size, speed)
+    return run_blocks(blocks, var_names, jump_type, mass, data_rate, on_event, on_block)
+
+
+# Grava um arquivo ACP em um fluxo (ex: stdout) na taxa registrada, para testar
+# as fontes de arquivo em gravação e pipe
+def write_replay(file_path, out, block_size=STREAM_BLOCK_SIZE, speed=1.0):
+    data, _, _, _, data_rate = read_replay(file_path)
+
+    with open(file_path, 'r') as f:
+        for line in iter(f.readline, ''):
+            out.write(line)
+            if "Time (s)" in line:
+                break
+    out.flush()
+
+    for rows in replay_blocks(data, data_rate, block_size, speed):
+        np.savetxt(out, rows, delimiter='\t', fmt='%.6f')
+        out.flush()
+
+
+def print_event(event):
+    if event["event"] == "jump":
+        print("[{time:8.3f} s] Salto: altura {h:.3f} m (voo {ft:.3f} s), decolagem {v:.3f} m/s, RSI mod. {rsi:.3f}".format(
+            time=event["time"], h=event["jump_height_flight"], ft=event["flight_time"],
+            v=event["takeoff_velocity"], rsi=event["rsi_modified"]))
+    else:
+        print("[{time:8.3f} s] {event}".format(time=event["time"], event=event["event"]))
+    sys.stdout.flush()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Análise em tempo real dos dados da plataforma de força")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", metavar="ARQUIVO", help="Reproduz um arquivo ACP na taxa registrada")
+    source.add_argument("--tail", metavar="ARQUIVO", help="Acompanha um arquivo ACP em gravação")
+    source.add_argument("--stdin", action="store_true", help="Lê um fluxo ACP da entrada padrão (pipe)")
+    source.add_argument("--write-replay", metavar="ARQUIVO",
+                        help="Grava um arquivo ACP na saída padrão na taxa registrada")
+    parser.add_argument("--block-size", type=int, default=STREAM_BLOCK_SIZE, help="Amostras por bloco")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Velocidade da reprodução (0 entrega sem espera)")
+    parser.add_argument("--idle-timeout", type=float, default=5.0,
+                        help="Encerra o acompanhamento após este tempo sem novas amostras (s)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.replay:
+        replay(args.replay, args.block_size, args.speed, on_event=print_event)
+    elif args.tail:
+        with open(args.tail, 'r') as f:
+            analyze_stream(FollowReader(f, idle_timeout=args.idle_timeout), args.block_size, on_event=print_event)
+    elif args.stdin:
+        analyze_stream(sys.stdin, args.block_size, on_event=print_event)
+    else:
+        write_replay(args.write_replay, sys.stdout, args.block_size, args.speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# Arquivo: trace_functions.py
+#
+# :: Instrumentação por etapa (spans) das execuções
+# :: Cada span registra nome, categoria, início, duração, processo, thread e
+# :: argumentos (ex: voluntário e ensaio). Desativada, span() retorna um objeto
+# :: vazio compartilhado e o custo é o de uma chamada de função.
+# :: Os spans de cada processo são coletados e enviados ao processo principal,
+# :: que os exporta em JSON ou no formato de eventos do Chrome (chrome://tracing,
+# :: Perfetto) e imprime um resumo dos ensaios e etapas mais lentos
+
+import os
+import json
+import time
+import threading
+
+
+TRACE_VERSION = 1
+
+# Categoria dos spans que representam um ensaio completo (usada no resumo)
+TRIAL_CATEGORY = "trial"
+
+# Estado por processo
+trace_state = {"enabled": False, "spans": []}
+
+
+def configure(enabled):
+    trace_state["enabled"] = bool(enabled)
+
+
+def tracing_enabled():
+    return trace_state["enabled"]
+
+
+class Span:
+    __slots__ = ("name", "category", "args", "start", "wall_start")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        trace_state["spans"].append({
+            "name":     self.name,
+            "category": self.category,
+            "start":    self.wall_start,
+            "duration": duration,
+            "pid":      os.getpid(),
+            "tid":      threading.get_ident(),
+            "args":     self.args,
+        })
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = NullSpan()
+
+
+# Uso: with trace_f.span("jumpy.filter", "jumpy", trial=...): ...
+def span(name, category="stage", **args):
+    if not trace_state["enabled"]:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+# Retira e retorna os spans registrados no processo (ex: ao fim de uma tarefa)
+def collect():
+    spans = trace_state["spans"]
+    trace_state["spans"] = []
+    return spans
+
+
+# Incorpora spans coletados em outro processo
+def merge(spans):
+    if spans:
+        trace_state["spans"].extend(spans)
+
+
+######################### Exportação #########################
+
+def export_json(file_path, spans):
+    origin = min([s["start"] for s in spans], default=0)
+    with open(file_path, 'w') as f:
+        json.dump({
+            "version": TRACE_VERSION,
+            "origin":  origin,
+            "spans":   [dict(s, start=s["start"] - origin) for s in spans],
+        }, f, indent=1)
+    return file_path
+
+
+# Formato de eventos do Chrome: eventos completos ("X") com tempos em microssegundos
+def export_chrome_trace(file_path, spans):
+    origin = min([s["start"] for s in spans], default=0)
+    events = [{
+        "name": s["name"],
+        "cat":  s["category"],
+        "ph":   "X",
+        "ts":   (s["start"] - origin) * 1e6,
+        "dur":  s["duration"] * 1e6,
+        "pid":  s["pid"],
+        "tid":  s["tid"],
+        "args": s["args"],
+    } for s in spans]
+    with open(file_path, 'w') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return file_path
+
+
+######################### Resumo #########################
+
+# Tempo total, número de ocorrências e maior duração de cada etapa
+def stage_totals(spans):
+    totals = {}
+    for s in spans:
+        if s["category"] == TRIAL_CATEGORY:
+            continue
+        total = totals.setdefault(s["name"], {"total": 0.0, "count": 0, "max": 0.0})
+        total["total"] += s["duration"]
+        total["count"] += 1
+        total["max"] = max(total["max"], s["duration"])
+    return totals
+
+
+def print_summary(spans, top=10):
+    trials = sorted([s for s in spans if s["category"] == TRIAL_CATEGORY],
+                    key=lambda s: s["duration"], reverse=True)[:top]
+    stages = sorted(stage_totals(spans).items(), key=lambda item: item[1]["total"], reverse=True)[:top]
+
+    print("\nEnsaios mais lentos:")
+    print("{:>10}  {:<12} {}".format("Tempo (s)", "Voluntário", "Ensaio"))
+    for s in trials:
+        print("{:>10.3f}  {:<12} {}".format(s["duration"], str(s["args"].get("subject", "-")), s["name"]))
+
+    print("\nEtapas mais lentas (soma entre ensaios e processos):")
+    print("{:>10} {:>6} {:>10}  {}".format("Total (s)", "N", "Máx (s)", "Etapa"))
+    for name, total in stages:
+        print("{:>10.3f} {:>6} {:>10.3f}  {}".format(total["total"], total["count"], total["max"], name))